@@ -1,18 +1,66 @@
 """
 Small package of Python utilities for extracting and cleaning DASH13 data
 from "ASCII files to be worked" directory.
+
+Only extract and clean are imported with the package.  Modules that need
+pandas (db_funs, d13_dbf, snapshot, index) are imported on first use, as
+are the names db_funs exports, so that e.g. a worker which only classifies
+report lines never pays for importing pandas.  The other submodules
+(manifest, metrics, external, fileutil, benchmarks) are imported on first
+use too, but need no pandas.
 """
 
-try:
-    import pandas
-except ImportError:
-    print """This package depends upon the pandas package.  Please make
-    sure that pandas is installed and is accessible from PYPATH.
-    """
-    raise
+import sys
+import types
 
 from .extract import *
 from .clean import *
-from .db_funs import *
 
-from . import d13_dbf
+# submodules imported when first asked for
+_LAZY_MODULES = ('db_funs', 'd13_dbf', 'snapshot', 'manifest', 'metrics',
+                 'index', 'external', 'fileutil', 'benchmarks')
+# those of them that need pandas
+_PANDAS_MODULES = ('db_funs', 'd13_dbf', 'snapshot', 'index')
+
+class _Package(types.ModuleType):
+    """
+    The package module, loading its pandas-dependent parts when one of
+    their names is first looked up.  __getattr__ is only consulted for
+    names not already set.
+    """
+    def __getattr__(self, name):
+        if name in _LAZY_MODULES:
+            return self._load(name)
+        if name.startswith('__') and name != '__all__':
+            raise AttributeError(name)
+        db_funs = self._load('db_funs')
+        for k, v in vars(db_funs).items():  # as from .db_funs import *
+            if not k.startswith('_') and k not in self.__dict__:
+                setattr(self, k, v)
+        if name == '__all__':  # for "from dash13 import *"
+            self._load('d13_dbf')
+            return [k for k in self.__dict__ if not k.startswith('_')]
+        try:
+            return self.__dict__[name]
+        except KeyError:
+            raise AttributeError("'module' object has no attribute '%s'" %
+                                 name)
+
+    def _load(self, name):
+        if name in _PANDAS_MODULES:
+            try:
+                import pandas
+            except ImportError:
+                print """This package depends upon the pandas package.  Please make
+    sure that pandas is installed and is accessible from PYPATH.
+    """
+                raise
+        __import__(self.__name__ + '.' + name)
+        return self.__dict__[name]
+
+_package = _Package(__name__, __doc__)
+_package.__dict__.update(sys.modules[__name__].__dict__)
+# keep the original module alive, as Python 2 clears a module's globals
+# (which the functions above still use) when it is freed
+_package._module = sys.modules[__name__]
+sys.modules[__name__] = _package
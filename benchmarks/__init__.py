@@ -0,0 +1,21 @@
+"""
+Benchmarks for the dash13 package.  Each module is a script, run as e.g.
+
+    python -m dash13.benchmarks.classify
+
+from the directory above the package.  Unless told otherwise they run on
+synthetic data from synth, so no DASH13 data files are needed.
+"""
+
+import time
+
+def best_of(fn, repeat=3):
+    """Return the best wall time, in seconds, of repeat calls to fn()."""
+    best = None
+    for i in range(repeat):
+        start = time.time()
+        fn()
+        elapsed = time.time() - start
+        if best is None or elapsed < best:
+            best = elapsed
+    return best
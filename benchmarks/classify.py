@@ -0,0 +1,41 @@
+"""
+Time the line classifier: extract.classify against the old cascade of
+matches in interesting(), per line and over whole report files.
+
+    python -m dash13.benchmarks.classify [nlines]
+"""
+
+import sys
+import os
+import shutil
+import tempfile
+
+from .. import extract
+from . import legacy, synth, best_of
+
+def main(nlines=200000):
+    lines = [l.strip() for l in synth.sampleLines(nlines)]
+    for name, fn in [('cascade', legacy.interesting),
+                     ('classify', extract.interesting)]:
+        t = best_of(lambda: [fn(l) for l in lines])
+        print '%-10s %10.0f lines/s' % (name, nlines / t)
+
+    tmp = tempfile.mkdtemp()
+    try:
+        path = os.path.join(tmp, 'FAU0000.TXT')
+        synth.writeReport(path, nlines // 2)
+        with open(path) as f:
+            physical = sum(1 for l in f)
+        def scan(fn):
+            with open(path) as f:
+                return list(fn(f))
+        assert scan(legacy.logicalLines) == scan(extract.logicalLines)
+        for name, fn in [('old scan', legacy.logicalLines),
+                         ('new scan', extract.logicalLines)]:
+            t = best_of(lambda: scan(fn))
+            print '%-10s %10.0f lines/s' % (name, physical / t)
+    finally:
+        shutil.rmtree(tmp)
+
+if __name__ == '__main__':
+    main(*[int(a) for a in sys.argv[1:]])
@@ -0,0 +1,46 @@
+"""
+Time the columnar cleaning steps (db_funs.clean_frame) against the Record
+based ones in clean.py, and check they keep the same records.
+
+    python -m dash13.benchmarks.clean_frame [nrows]
+"""
+
+import sys
+import time
+
+from .. import clean, db_funs
+from . import synth
+
+def objectPath(rows, priority):
+    rl = clean.getRecords(rows)
+    rl = clean.removeDuplicateRecords(rl)
+    rl = clean.removeBlankNarrEvent(rl)
+    return clean.removeDuplicateIds(rl, priority)
+
+def columnarPath(rows, priority):
+    return db_funs.clean_frame(db_funs.rows_to_frame(rows), priority)
+
+def survivors(result):
+    """Return sorted (recId, EVENT_DATE, len(NARR)) of cleaned records."""
+    try:
+        return sorted((r.recId, r.EVENT_DATE, len(r.NARR)) for r in result)
+    except AttributeError:
+        return sorted(zip(result['recId'], result['EVENT_DATE'],
+                          result['NARR'].str.len()))
+
+def main(n=1000000):
+    rows = synth.rows(n)
+    for priority in ['byEventDate', 'byNarr']:
+        results = list()
+        for name, fn in [('records', objectPath), ('columnar', columnarPath)]:
+            data = [list(r) for r in rows]  # Record() modifies its list
+            start = time.time()
+            results.append(fn(data, priority))
+            print '%-8s %-11s %8d rows in %6.2f s' % (name, priority, n,
+                                                      time.time() - start)
+        same = survivors(results[0]) == survivors(results[1])
+        print '%d survivors, %s' % (len(results[1]),
+                                    'same' if same else 'DIFFERENT')
+
+if __name__ == '__main__':
+    main(*[int(a) for a in sys.argv[1:]])
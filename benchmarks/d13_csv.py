@@ -0,0 +1,36 @@
+"""
+Time d13_dbf.csvToDataFrame, whole and in chunks, against the version that
+split and zipped the DASH13 CSV export one line at a time.
+
+    python -m dash13.benchmarks.d13_csv [nrecords]
+"""
+
+import os
+import sys
+import tempfile
+
+from .. import d13_dbf
+from . import legacy, synth, best_of
+
+def main(n=500000):
+    fd, path = tempfile.mkstemp(suffix='.csv')
+    os.close(fd)
+    try:
+        synth.writeDash13Csv(path, n)
+        print '%d records, %.1f MB of CSV' % (
+            n, os.path.getsize(path) / 2.0**20)
+        readers = [('read_csv', lambda: d13_dbf.csvToDataFrame(path)),
+                   ('chunked', lambda: d13_dbf.csvToDataFrame(path, 50000)),
+                   ('per-line', lambda: legacy.csvToDataFrame(path))]
+        frames = dict()
+        for name, fn in readers:
+            print '%-9s %8d rows in %6.2f s' % (name, n, best_of(fn))
+            frames[name] = fn()
+        for name in ['read_csv', 'chunked']:
+            print '%s frame equals per-line: %s' % (
+                name, frames[name].equals(frames['per-line']))
+    finally:
+        os.remove(path)
+
+if __name__ == '__main__':
+    main(*[int(a) for a in sys.argv[1:]])
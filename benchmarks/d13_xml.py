@@ -0,0 +1,51 @@
+"""
+Time and measure peak memory of reading a DASH13 XML export with
+d13_dbf.xmlToDataFrame, which streams the document with iterparse,
+against the version that parsed it whole.  Each reader runs in its own
+process so that its peak resident size can be read back (Unix only).
+
+    python -m dash13.benchmarks.d13_xml [nrecords]
+"""
+
+import os
+import sys
+import time
+import resource
+import tempfile
+import multiprocessing
+
+from .. import d13_dbf
+from . import legacy, synth
+
+READERS = {'iterparse': d13_dbf.xmlToDataFrame,
+           'parse': legacy.xmlToDataFrame}
+
+def measure(args):
+    name, path = args
+    start = time.time()
+    df = READERS[name](path)
+    elapsed = time.time() - start
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024.0
+    return len(df), elapsed, peak, df.sort_values('REC_ID').values.tolist()
+
+def main(n=300000):
+    fd, path = tempfile.mkstemp(suffix='.xml')
+    os.close(fd)
+    try:
+        synth.writeDash13Xml(path, n)
+        print '%d records, %.1f MB of XML' % (
+            n, os.path.getsize(path) / 2.0**20)
+        results = dict()
+        for name in ['iterparse', 'parse']:
+            pool = multiprocessing.Pool(1, maxtasksperchild=1)
+            nrows, elapsed, peak, results[name] = pool.apply(measure,
+                                                             [(name, path)])
+            pool.close()
+            print '%-10s %8d rows in %6.2f s, peak RSS %7.1f MB' % (
+                name, nrows, elapsed, peak)
+        print 'frames agree:', results['iterparse'] == results['parse']
+    finally:
+        os.remove(path)
+
+if __name__ == '__main__':
+    main(*[int(a) for a in sys.argv[1:]])
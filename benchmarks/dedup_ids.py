@@ -0,0 +1,47 @@
+"""
+Time clean.removeDuplicateIds, which keeps a running best per recId,
+against grouping every record by recId and sorting each group, and
+compare peak memory when records are streamed in.  Each version runs in
+its own process so that its peak resident size can be read back (Unix
+only).
+
+    python -m dash13.benchmarks.dedup_ids [nrecords]
+"""
+
+import sys
+import time
+import resource
+import multiprocessing
+
+from .. import clean
+from . import legacy, synth
+
+VERSIONS = {'running best': clean.removeDuplicateIds,
+            'group & sort': legacy.removeDuplicateIds}
+
+def measure(args):
+    name, n, priority = args
+    # rows are made before timing starts, records streamed from them
+    rows = synth.rows(n, 0, .5)
+    base = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    start = time.time()
+    kept = VERSIONS[name]((clean.Record(r) for r in rows), priority)
+    elapsed = time.time() - start
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss - base
+    return elapsed, peak / 1024.0, sorted(r.values for r in kept)
+
+def main(n=500000):
+    for priority in ['byEventDate', 'byNarr']:
+        results = dict()
+        for name in ['running best', 'group & sort']:
+            pool = multiprocessing.Pool(1, maxtasksperchild=1)
+            elapsed, peak, results[name] = pool.apply(measure,
+                                                      [(name, n, priority)])
+            pool.close()
+            print '%-11s %-12s %8d records in %5.2f s, +%6.1f MB peak' % (
+                priority, name, n, elapsed, peak)
+        print '%-11s same records kept: %s' % (
+            priority, results['running best'] == results['group & sort'])
+
+if __name__ == '__main__':
+    main(*[int(a) for a in sys.argv[1:]])
@@ -0,0 +1,36 @@
+"""
+Time out-of-core dedup (external.iterBestById, and external.
+iterDistinctRecords followed by it) against the in-memory
+clean.iterDistinctRecords and clean.removeDuplicateIds, at a run size well
+below the number of records, and check that they keep the same records.
+
+    python -m dash13.benchmarks.external [nrecords [runsize]]
+"""
+
+import sys
+
+from .. import clean, external
+from . import synth, best_of
+
+def main(n=300000, runsize=50000):
+    rows = synth.rows(n, 0, .3)
+    records = lambda: (clean.Record(list(r)) for r in rows)
+    versions = [
+        ('in memory', lambda: clean.removeDuplicateIds(
+            clean.iterDistinctRecords(records()))),
+        ('distinct + best', lambda: list(external.iterBestById(
+            external.iterDistinctRecords(records(), runsize),
+            runsize=runsize))),
+        ('best only', lambda: list(external.iterBestById(records(),
+                                                         runsize=runsize)))]
+    kept = dict()
+    for name, fn in versions:
+        kept[name] = sorted(r.values for r in fn())
+        print '%-16s %8d records in %6.2f s, %d kept' % (
+            name, n, best_of(fn, 1), len(kept[name]))
+    for name, fn in versions[1:]:
+        print '%-16s keeps the same records: %s' % (
+            name, kept[name] == kept['in memory'])
+
+if __name__ == '__main__':
+    main(*[int(a) for a in sys.argv[1:]])
@@ -0,0 +1,78 @@
+"""
+Check extract.parseline against a golden corpus of data lines and their
+expected fields, then time it against the version that re-split the line
+for each field.
+
+    python -m dash13.benchmarks.handleline [nlines]
+    python -m dash13.benchmarks.handleline --regen
+
+--regen rewrites the golden corpus from legacy.parseline.  Lines on which
+that version raised IndexError are left out of the corpus.
+"""
+
+import sys
+import os
+import json
+import random
+
+from .. import extract
+from . import legacy, synth, best_of
+
+GOLDEN = os.path.join(os.path.dirname(__file__), 'handleline_golden.txt')
+
+def goldenLines(seed=0):
+    """Lines for the golden corpus: synthetic data lines, then mangled ones."""
+    rnd = random.Random(seed)
+    lines = [synth.dataLine(rnd) for i in range(600)]
+    for i in range(400):
+        toks = synth.dataLine(rnd).split()
+        if rnd.random() < .2:
+            rnd.shuffle(toks)
+        toks = toks[:rnd.randint(0, len(toks))]
+        seps = [rnd.choice([' ', ' ', '  ', '\t']) for t in toks]
+        lines.append(''.join(t + s for t, s in zip(toks, seps)).strip())
+    return lines
+
+def regen():
+    with open(GOLDEN, 'w') as f:
+        for line in goldenLines():
+            try:
+                values, weird = legacy.parseline(line)
+            except IndexError:
+                continue
+            f.write(json.dumps([line, values, weird]) + '\n')
+
+def check():
+    """Return list of (line, expected, got) where parseline differs."""
+    bad = list()
+    with open(GOLDEN) as f:
+        for entry in f:
+            line, values, weird = json.loads(entry)
+            line = str(line)  # json gives unicode
+            got = extract.parseline(line)
+            if got != (values, weird):
+                bad.append((line, (values, weird), got))
+    return bad
+
+def main(nlines=50000):
+    bad = check()
+    for line, expected, got in bad:
+        print 'MISMATCH %r\n  expected %r\n  got      %r' % (line, expected,
+                                                            got)
+    print '%d golden mismatches' % len(bad)
+
+    rnd = random.Random(1)
+    for lo, hi in [(2, 14), (40, 120)]:
+        lines = [synth.dataLine(rnd) + ' ' + synth.narrative(rnd, lo, hi) for
+                 i in range(nlines)]
+        for name, fn in [('re-split', legacy.parseline),
+                         ('split once', extract.parseline)]:
+            t = best_of(lambda: [fn(l) for l in lines])
+            print '%-10s narr %3d-%3d words %10.0f lines/s' % (name, lo, hi,
+                                                               nlines / t)
+
+if __name__ == '__main__':
+    if sys.argv[1:] == ['--regen']:
+        regen()
+    else:
+        main(*[int(a) for a in sys.argv[1:]])
@@ -0,0 +1,48 @@
+"""
+Time importing the package in a fresh interpreter: just enough to use the
+line classifier, and then the pandas-dependent parts too.  The first
+should be well under 100 ms, and should not import pandas.
+
+    python -m dash13.benchmarks.import_time [repeat]
+"""
+
+import os
+import sys
+import subprocess
+
+PARENT = os.path.dirname(os.path.dirname(os.path.dirname(
+    os.path.abspath(__file__))))
+PACKAGE = os.path.basename(os.path.dirname(os.path.dirname(
+    os.path.abspath(__file__))))
+
+SCRIPT = """
+import sys, time
+start = time.time()
+import %(package)s
+%(package)s.%(attr)s
+print time.time() - start, 'pandas' in sys.modules
+"""
+
+def timeImport(attr, repeat):
+    """Return best time to import the package and look up attr, and
+    whether pandas was imported."""
+    best = None
+    for i in range(repeat):
+        out = subprocess.check_output(
+            [sys.executable, '-c', SCRIPT % {'package': PACKAGE,
+                                             'attr': attr}],
+            cwd=PARENT)
+        elapsed, pandas = out.split()
+        elapsed = float(elapsed)
+        if best is None or elapsed < best:
+            best = elapsed
+    return best, pandas == 'True'
+
+def main(repeat=5):
+    for attr in ['extract.interesting', 'ascii_to_df', 'd13_dbf']:
+        t, pandas = timeImport(attr, repeat)
+        print '%-20s %7.1f ms%s' % (attr, t * 1000,
+                                    ', imports pandas' if pandas else '')
+
+if __name__ == '__main__':
+    main(*[int(a) for a in sys.argv[1:]])
@@ -0,0 +1,74 @@
+"""
+Time looking records up in an index.RecordIndex, by recordId and by
+airframe and date range, against loading the frame from a snapshot and
+masking it, as a job without an index must.
+
+    python -m dash13.benchmarks.index [nrecords [nlookups]]
+"""
+
+import os
+import sys
+import time
+import random
+import shutil
+import tempfile
+
+from .. import clean, db_funs, index, snapshot
+from . import synth
+from .to_dataframe import COLUMNS
+
+def frame(n):
+    """Return cleaned, typed frame of n synthetic records, as after merge."""
+    df = db_funs.toDataFrame(
+        clean.removeDuplicateIds(clean.getRecords(synth.rows(n, 0))),
+        COLUMNS, True)
+    df['EVENT_DATE'] = df['FAULTDAT']
+    df['FAULTNO'] = df['FAULTNO'].astype(int)
+    return df
+
+def main(n=500000, nlookups=200):
+    df = frame(n)
+    rnd = random.Random(0)
+    recIds = [df['REC_ID'].iloc[rnd.randrange(len(df))]
+              for i in range(nlookups)]
+    airframes = [(df['EI_ID'].iloc[rnd.randrange(len(df))],
+                  synth.date(rnd), synth.date(rnd)) for i in range(nlookups)]
+    airframes = [(ei, min(a, b), max(a, b)) for ei, a, b in airframes]
+    tmp = tempfile.mkdtemp()
+    try:
+        start = time.time()
+        ix = index.build(df, os.path.join(tmp, 'records.sqlite'))
+        print 'built index of %d records in %.2f s, %.1f MB' % (
+            len(ix), time.time() - start,
+            os.path.getsize(ix.path) / 2.0**20)
+        snap = os.path.join(tmp, 'records.arrow')
+        snapshot.save(df, snap)
+
+        start = time.time()
+        found = [len(ix.get(r)) for r in recIds]
+        t = time.time() - start
+        print 'index get      %5d lookups in %6.3f s, %7.2f ms each' % (
+            nlookups, t, t / nlookups * 1000)
+        start = time.time()
+        ranges = [len(ix.between(*a)) for a in airframes]
+        t = time.time() - start
+        print 'index between  %5d lookups in %6.3f s, %7.2f ms each' % (
+            nlookups, t, t / nlookups * 1000)
+
+        # without an index each job loads the frame, then masks it
+        start = time.time()
+        full = snapshot.load(snap)
+        load = time.time() - start
+        start = time.time()
+        masked = [(full['REC_ID'] == r).sum() for r in recIds[:20]]
+        t = (time.time() - start) / 20
+        print 'snapshot load %6.3f s, then %7.2f ms per recordId mask' % (
+            load, t * 1000)
+        print 'same records found:', (found[:20] == masked and
+                                      sum(ranges) > 0)
+        ix.close()
+    finally:
+        shutil.rmtree(tmp)
+
+if __name__ == '__main__':
+    main(*[int(a) for a in sys.argv[1:]])
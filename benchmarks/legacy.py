@@ -0,0 +1,262 @@
+"""
+Earlier versions of routines since rewritten for speed, kept only so the
+benchmarks can time the rewrites against them.  Not for use elsewhere.
+"""
+
+from ..extract import (DATELINE, STATUSLINE, REDXLINE, CIRCLELINE,
+                       STFAULTLINE, FIELDLINE, AWAAMLINE, TOTRECORDSLINE,
+                       TOTPAGESLINE, TOTFIELDSLINE, ELAPSEDTIMELINE,
+                       SUMMARYLINE, DASHLINE, STARLINE, simplify, likelyPageNo,
+                       tooFewValues, looksLikeDate, isJunkU, looksLikeSysCode,
+                       looksLikeModel, looksLikeStatus, firstToken,
+                       secondToken, thirdToken, fourthToken, sixthToken,
+                       noNarrField, check)
+from ..clean import serno_uid_map, uid_eid_map
+from .. import extract
+from collections import defaultdict
+from ..d13_dbf import DEF
+import xml.etree.ElementTree as et
+import pandas
+
+def interesting(s):
+    """extract.interesting as a cascade of separate matches."""
+    if not s: return False
+    elif DATELINE.match(s): return False
+    elif STATUSLINE.match(s): return False
+    elif REDXLINE.match(s): return False
+    elif CIRCLELINE.match(s): return False
+    elif STFAULTLINE.match(s): return False
+    elif FIELDLINE.match(s): return False
+    elif AWAAMLINE.match(s): return False
+    elif TOTRECORDSLINE.match(s): return False
+    elif TOTPAGESLINE.match(s): return False
+    elif TOTFIELDSLINE.match(s): return False
+    elif ELAPSEDTIMELINE.match(s): return False
+    elif SUMMARYLINE.match(s): return False
+    elif DASHLINE.match(s): return False
+    elif STARLINE.match(s): return False
+    elif simplify(s) == 'CLOSED': return False
+    elif likelyPageNo(s):
+        return False
+    return True
+
+def logicalLines(read):
+    """extract.logicalLines, testing lines with interesting() as it goes."""
+    buf = read.readline().strip()
+    nextline = read.readline()
+    lineno = 1  # line number in buffer
+    while nextline:
+        if interesting(buf):
+            if interesting(nextline.strip()):
+                # handle case where narr split b/w lines
+                buf += nextline.strip()
+                nextline = read.readline()
+                lineno += 1
+            elif likelyPageNo(nextline.strip()):
+                # handle case where narr split b/w pages
+                while (nextline and 
+                       not interesting(nextline.strip())):
+                    nextline = read.readline()
+                    lineno += 1
+                if nextline and len(nextline.split()) <= 4:  # number found by experimentation
+                    buf += nextline.strip()
+                    nextline = read.readline()
+                    lineno += 1
+            # write out what's in buf
+            yield buf, lineno
+        # check before assigning EOF to buf
+        if nextline:
+            buf = nextline.strip()
+            lineno += 1
+            nextline = read.readline()
+    # don't forget last line in buffer...
+    if interesting(buf):
+        yield buf, lineno
+
+def parseline(line):
+    """extract.parseline, re-splitting the line for each field it looks at."""
+    if tooFewValues(line):
+        return None, line
+    l = list()
+    if looksLikeDate(firstToken(line)):
+        if isJunkU(thirdToken(line)):
+            l = line.split(None, 3)
+            l.pop(2)
+            line = ' '.join(l)
+        if looksLikeSysCode(fourthToken(line)): # wuc code looks split
+            l = line.split(None, 9)
+            l[1] += '-' + l[2]
+            l.pop(2)
+            line = ' '.join(l)
+        if looksLikeModel(secondToken(line)):  # no wuc, no sys code
+            if not looksLikeStatus(sixthToken(line)):  # missing status value
+                l = line.split(None, 5)
+                l.insert(1, '')
+                l.insert(2, '')
+                l.insert(7, '')
+            else:
+                l.insert(1, '')
+                l.insert(2, '')
+        elif looksLikeSysCode(thirdToken(line)): # something probly exists in wuc code
+            l = line.split(None, 8)
+        else: # insert null value for wuc code
+            l = line.split(None, 7)
+            l.insert(1, '')
+    else:  # date completed not found
+        if isJunkU(secondToken(line)):
+            l = line.split(None, 2)
+            l.pop(1)
+            line = ' '.join(l)
+        if looksLikeSysCode(thirdToken(line)): # wuc code looks split
+            l = line.split(None, 8)
+            l[0] += '-' + l[1]
+            l.pop(1)
+            line = ' '.join(l)
+        if looksLikeSysCode(secondToken(line)): # something probly exists for wuc code
+            l = line.split(None, 7)
+            l.insert(0, '')            # insert null value for date completed
+        else:
+            l = line.split(None, 6)
+            l.insert(0, '') #insert null value for date completed
+            l.insert(1, '') #insert null value for wuc code
+
+    if noNarrField(l):
+        l.append('')
+
+    # line cleaned up as much as can be, now check
+    if check(l):
+        return l, None
+    return None, line
+
+class Record(object):
+    """clean.Record as a plain object, building recId and hash on demand."""
+    def __init__(self, l):
+        if len(l) != 11:  # quick check
+            raise RuntimeError("Cannot create record from list: %s" % str(l))
+        self._serno = str(l[4])
+        l[4] = scrub_serno(l[4])
+        self.values = tuple(l)
+
+    @property
+    def wholerec(self):
+        return self.values[:-2]
+    @property
+    def recId(self):
+        return '_'.join([self.values[5], self.values[6], self.values[4],
+                         self.values[2]])
+    @property
+    def EVENT_DATE(self):
+        return self.values[5]
+    @property
+    def NARR(self):
+        return self.values[8]
+
+    def __hash__(self):
+        return hash(''.join(self.wholerec))
+
+    def __eq__(self, other):
+        return hash(self) == hash(other)
+
+def corrdate(draft):
+    """db_funs.merge_ascii's CORRDATE, looked up one element at a time."""
+    return pandas.Series([min(draft['CORRDATE_fau'][i], 
+                              draft['CORRDATE_act'][i]) for i 
+                              in draft.index])
+
+def toDataFrame(rl, col_names):
+    """db_funs.toDataFrame through DataFrame.from_items (gone in pandas 1.0)."""
+    d = [(r.recId, tuple([r.recId]) + r.wholerec) for r in rl]
+    return pandas.DataFrame.from_items(d, orient='index',
+            columns=col_names)
+
+def xmlToDataFrame(path):
+    """d13_dbf.xmlToDataFrame, parsing the whole document into one tree."""
+    dicts = list()
+    tree = et.parse(path)
+    root = tree.getroot()
+    for record in root:
+        rec = dict.fromkeys(DEF.__dash13_fields__, '')
+        for field in record:
+            rec[field.tag.strip()] = field.text
+        rec['REC_ID'] = '_'.join([ rec['FAULTDAT'],
+                                   rec['FAULTNO'],
+                                   rec['UNIT_ID'],
+                                   rec['SYS_CODE']
+                                 ])
+        dicts.append(rec)
+    return pandas.DataFrame(dicts)
+
+def csvToDataFrame(path):
+    """d13_dbf.csvToDataFrame, splitting and zipping one line at a time."""
+    dicts = list()
+    with open(path, 'r') as data:
+        keys = data.readline().split(DEF.__ascii_csv_delim__)
+        keys = [k.strip() for k in keys]
+        for lineno, line in enumerate(data, 2):
+            values = line.split(DEF.__ascii_csv_delim__)
+            values = [v.strip() for v in values]
+            temp = dict(zip(keys, values))
+            try:
+                temp['REC_ID'] = '_'.join([ temp['FAULTDAT'],
+                                        temp['FAULTNO'],
+                                        temp['UNIT_ID'],
+                                        temp['SYS_CODE']
+                                      ])
+            except KeyError:
+                print lineno, temp
+                raise
+            dicts.append(temp)
+    return pandas.DataFrame(dicts)
+
+def scrub_serno(serno):
+    """clean.scrub_serno as a probe of each of the two mappings in turn."""
+    serno_uid, uid_eid = serno_uid_map(), uid_eid_map()
+    uid = serno_uid[serno] if serno in serno_uid else serno
+    return uid_eid[uid] if uid in uid_eid else uid
+
+def iter_file(path, weirdos=None):
+    """extract.iter_file, reading lines from a text file handle."""
+    with open(path, 'r') as read:
+        for buf, lineno in extract.logicalLines(read):
+            l, line = extract.parseline(buf)
+            if l is None:
+                if weirdos is not None:
+                    weirdos.append((line, path, lineno))
+                continue
+            l.append(path)
+            l.append(str(lineno))
+            yield l
+
+def removeDuplicateIds(rl, priority='byEventDate'):
+    """
+    clean.removeDuplicateIds grouping all records by recId, then fully
+    sorting each group with a cmp function to keep its first.
+    """
+    def recCmpNarr(rec1, rec2):
+        diff = len(rec1.NARR) - len(rec2.NARR)
+        return (int(rec1.EVENT_DATE) - int(rec2.EVENT_DATE) if
+                not diff else diff)
+
+    def recCmpEvent(rec1, rec2):
+        diff = int(rec1.EVENT_DATE) - int(rec2.EVENT_DATE)
+        return (diff if diff else
+                len(rec1.NARR) - len(rec2.NARR))
+
+    ret = defaultdict(list)
+    for record in rl:
+        ret[record.recId].append(record)
+    for key in ret.keys():
+        ret[key] = sorted(ret[key],
+                          cmp=(recCmpNarr if priority == 'byNarr' else
+                               recCmpEvent),
+                          reverse=True)[0]
+    return ret.values()
+
+def sortById(recList):
+    """
+    clean.sortById on a string key built for each Record (which sorted
+    every column ascending).
+    """
+    return sorted(recList, key=lambda rec: ''.join([rec.EI_ID,
+                                                    rec.EVENT_DATE,
+                                                    rec.EVENT_NO]))
@@ -0,0 +1,43 @@
+"""
+Time CORRDATE reconciliation in db_funs.merge_ascii (db_funs.earliest)
+against the element-by-element loop it replaced, on a merged frame where
+some records are only in FAU or only in ACT files.
+
+    python -m dash13.benchmarks.merge_ascii [nrows]
+"""
+
+import sys
+import random
+
+import numpy
+import pandas
+
+from .. import db_funs
+from . import legacy, synth, best_of
+
+def draft(n, missing=.1, seed=0):
+    """Return frame of n FAU/ACT CORRDATE pairs, some of each missing."""
+    rnd = random.Random(seed)
+    fau, act = list(), list()
+    for i in range(n):
+        r = rnd.random()
+        fau.append(numpy.nan if r < missing else synth.date(rnd))
+        act.append(numpy.nan if r > 1 - missing else synth.date(rnd))
+    return pandas.DataFrame({'CORRDATE_fau': fau, 'CORRDATE_act': act})
+
+def main(n=200000):
+    df = draft(n)
+    loop = legacy.corrdate(df)
+    vector = db_funs.earliest(df['CORRDATE_fau'], df['CORRDATE_act'])
+    both = (df['CORRDATE_fau'].notnull() & df['CORRDATE_act'].notnull())
+    print 'rows with both dates: %d, agreeing: %d' % (
+        both.sum(), (loop[both] == vector[both]).sum())
+    print 'rows with one date: %d, missing from loop: %d, from earliest: %d' % (
+        (~both).sum(), loop[~both].isnull().sum(), vector[~both].isnull().sum())
+    for name, fn in [('loop', lambda: legacy.corrdate(df)),
+                     ('earliest', lambda: db_funs.earliest(
+                         df['CORRDATE_fau'], df['CORRDATE_act']))]:
+        print '%-8s %8d rows in %7.3f s' % (name, n, best_of(fn))
+
+if __name__ == '__main__':
+    main(*[int(a) for a in sys.argv[1:]])
@@ -0,0 +1,42 @@
+"""
+Time db_funs.merge_ascii merging whole in one process against merging in
+buckets by EI_ID across a pool of processes, and check the merged rows
+agree.
+
+    python -m dash13.benchmarks.merge_partitioned [nrecords [maxprocesses]]
+"""
+
+import sys
+import multiprocessing
+
+from .. import db_funs
+from . import synth, best_of
+from .to_dataframe import COLUMNS
+
+def frames(n):
+    """Return FAU and ACT frames of about n records each, mostly sharing
+    recIds, as from frame_to_df."""
+    rows = synth.rows(n, 0, 0)
+    fau = db_funs.frame_to_df(db_funs.clean_frame(db_funs.rows_to_frame(
+        [list(r) for r in rows])), COLUMNS)
+    act = db_funs.frame_to_df(db_funs.clean_frame(db_funs.rows_to_frame(
+        [list(r) for r in rows[n // 10:]] + synth.rows(n // 10, 1, 0))),
+        COLUMNS[:-1] + ['ACTION'])
+    return fau, act
+
+def canonical(df):
+    return df.sort_values(list(df.columns)).reset_index(drop=True)
+
+def main(n=500000, maxprocesses=None):
+    fau, act = frames(n)
+    print 'FAU %d rows, ACT %d rows' % (len(fau), len(act))
+    whole = canonical(db_funs.merge_ascii(fau, act))
+    counts = [1] + [p for p in (2, 4, 8)
+                    if p <= (maxprocesses or multiprocessing.cpu_count())]
+    for p in counts:
+        t = best_of(lambda: db_funs.merge_ascii(fau, act, p))
+        same = canonical(db_funs.merge_ascii(fau, act, p)).equals(whole)
+        print '%d process(es) %6.2f s, same rows: %s' % (p, t, same)
+
+if __name__ == '__main__':
+    main(*[int(a) for a in sys.argv[1:]])
@@ -0,0 +1,148 @@
+"""
+Time each stage of the ASCII pipeline, as ascii_to_df runs it (extract,
+getRecords, removeDuplicateRecords, removeBlankNarrEvent,
+removeDuplicateIds, toDataFrame, merge_ascii), on synthetic corpora of
+paired FAU and ACT report files at several sizes.
+
+    python -m dash13.benchmarks.pipeline [--save FILE] [--baseline FILE]
+                                         [nrecords ...]
+
+nrecords are records per FAU file (and per ACT file); each corpus has
+FILES pairs of files.  --save writes the timings as JSON, and --baseline
+compares them with timings saved earlier, flagging any stage more than
+TOLERANCE times slower as a regression (and exiting with status 1).
+Stages that took under MINTIME in the baseline are too noisy to judge.
+
+Each run of the pipeline is checked: at least MINEXTRACTED of the
+records written must come out of extraction (the rest are lines with the
+quirks extract rejects), and removeDuplicateRecords must find some of the
+records repeated between files.
+"""
+
+import sys
+import json
+import time
+import shutil
+import tempfile
+
+from .. import extract, clean, db_funs
+from . import synth
+from .to_dataframe import COLUMNS
+
+FILES = 8
+SIZES = [2000, 10000, 50000]
+REPEAT = 3
+TOLERANCE = 1.25
+MINTIME = .05  # seconds
+MINEXTRACTED = .85
+STAGES = ['extract', 'getRecords', 'removeDuplicateRecords',
+          'removeBlankNarrEvent', 'removeDuplicateIds', 'toDataFrame',
+          'merge_ascii']
+
+def runPipeline(base):
+    """
+    Run the pipeline on the corpus under base, FAU and ACT files alike, and
+    return dict of stage : wall time in seconds, the number of rows merged,
+    and dict of flag : (rows extracted, duplicate records removed).
+    """
+    times = dict.fromkeys(STAGES, 0.0)
+    counts = dict()
+    def timed(stage, fn, *args):
+        start = time.time()
+        result = fn(*args)
+        times[stage] += time.time() - start
+        return result
+    frames = list()
+    for flag, columns in [('FAU', COLUMNS), ('ACT', COLUMNS[:-1] + ['ACTION'])]:
+        rows = list()
+        timed('extract', extract.extract_data, base, flag, rows)
+        rl = timed('getRecords', clean.getRecords, rows)
+        nrecords = len(rl)
+        rl = timed('removeDuplicateRecords', clean.removeDuplicateRecords, rl)
+        counts[flag] = len(rows), nrecords - len(rl)
+        rl = timed('removeBlankNarrEvent', clean.removeBlankNarrEvent, rl)
+        rl = timed('removeDuplicateIds', clean.removeDuplicateIds, rl)
+        frames.append(timed('toDataFrame', db_funs.toDataFrame, rl, columns))
+    merged = timed('merge_ascii', db_funs.merge_ascii, *frames)
+    return times, len(merged), counts
+
+def measure(nrecords, repeat=REPEAT):
+    """
+    Return dict of stage : best wall time over repeat runs of the pipeline
+    on a corpus of FILES pairs of files of nrecords each, and the number of
+    rows merged.
+    """
+    base = tempfile.mkdtemp()
+    try:
+        synth.writePairedCorpus(base, FILES, nrecords, seed=nrecords)
+        written = synth.pairedCorpusSize(FILES, nrecords)
+        best = None
+        for i in range(repeat):
+            times, nrows, counts = runPipeline(base)
+            for flag, (extracted, duplicates) in counts.items():
+                assert extracted >= MINEXTRACTED * written, (
+                    '%s: %d rows extracted of %d records written' % (
+                        flag, extracted, written))
+                assert duplicates > 0, '%s: no duplicates removed' % flag
+            if best is None:
+                best = times
+            else:
+                best = dict((s, min(best[s], times[s])) for s in STAGES)
+    finally:
+        shutil.rmtree(base)
+    return best, nrows
+
+def compare(results, baseline, tolerance=TOLERANCE):
+    """
+    Print each stage's timing against baseline and return list of
+    (size, stage) that are more than tolerance times slower.
+    """
+    slower = list()
+    for size in sorted(results, key=int):
+        if size not in baseline:
+            continue
+        for stage in STAGES:
+            now, then = results[size][stage], baseline[size].get(stage)
+            if not then:
+                continue
+            flag = ''
+            if then >= MINTIME and now > then * tolerance:
+                flag = 'REGRESSION'
+                slower.append((size, stage))
+            print '%8s %-24s %7.3f s vs %7.3f s  %5.2fx %s' % (
+                size, stage, now, then, now / then, flag)
+    return slower
+
+def main(args):
+    save = baseline = None
+    sizes = list()
+    args = list(args)
+    while args:
+        a = args.pop(0)
+        if a == '--save':
+            save = args.pop(0)
+        elif a == '--baseline':
+            baseline = args.pop(0)
+        else:
+            sizes.append(int(a))
+    results = dict()
+    for n in sizes or SIZES:
+        times, nrows = measure(n)
+        results[str(n)] = times
+        print '%d files x %d records, %d rows merged' % (2 * FILES, n, nrows)
+        for stage in STAGES:
+            print '    %-24s %7.3f s' % (stage, times[stage])
+        print '    %-24s %7.3f s' % ('total', sum(times.values()))
+    if save is not None:
+        with open(save, 'w') as f:
+            json.dump(results, f, indent=1, sort_keys=True)
+    if baseline is not None:
+        with open(baseline) as f:
+            slower = compare(results, json.load(f))
+        if slower:
+            print '%d stage timings regressed' % len(slower)
+            return 1
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,48 @@
+"""
+Time extract.iter_data reading files one at a time against reading them
+ahead in background threads (prefetch), on a synthetic corpus, with a
+delay added to each open to stand in for a network share, and check
+that both give the same rows and weirdos.
+
+    python -m dash13.benchmarks.prefetch [nfiles [nrecords]]
+"""
+
+import sys
+import time
+import shutil
+import tempfile
+import __builtin__
+
+from .. import extract
+from . import synth, best_of
+
+LATENCIES = [0, .005, .02, .05]  # seconds per open
+
+def extract_all(base, prefetch):
+    weirdos = list()
+    rows = list(extract.iter_data(base, 'FAU', weirdos, prefetch=prefetch))
+    return rows, weirdos
+
+def main(nfiles=24, nrecords=5000):
+    base = tempfile.mkdtemp()
+    try:
+        synth.writeCorpus(base, nfiles, nrecords)
+        print 'same rows and weirdos:', (extract_all(base, 0) ==
+                                         extract_all(base, 4))
+        for latency in LATENCIES:
+            def slowopen(*args):
+                time.sleep(latency)
+                return __builtin__.open(*args)
+            extract.open = slowopen  # shadows open in extract only
+            try:
+                for prefetch in [0, 1, 4]:
+                    t = best_of(lambda: extract_all(base, prefetch))
+                    print 'latency %3d ms, prefetch %d: %6.2f s' % (
+                        latency * 1000, prefetch, t)
+            finally:
+                del extract.open
+    finally:
+        shutil.rmtree(base)
+
+if __name__ == '__main__':
+    main(*[int(a) for a in sys.argv[1:]])
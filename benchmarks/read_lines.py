@@ -0,0 +1,45 @@
+"""
+Throughput, in MB/s, of extract.iter_file, which reads report files
+through a memory map, against reading them from a text file handle, on a
+synthetic corpus; then of extract.logicalLines alone, without parsing.
+
+    python -m dash13.benchmarks.read_lines [nfiles [nrecords]]
+"""
+
+import os
+import sys
+import mmap
+import shutil
+import tempfile
+
+from .. import extract
+from . import legacy, synth, best_of
+
+def main(nfiles=12, nrecords=20000):
+    base = tempfile.mkdtemp()
+    try:
+        paths = synth.writeCorpus(base, nfiles, nrecords)
+        mb = sum(os.path.getsize(p) for p in paths) / 2.0**20
+        readers = [('file', legacy.iter_file), ('mmap', extract.iter_file)]
+        results = dict()
+        for name, iter_file in readers:
+            results[name] = [list(iter_file(p, list())) for p in paths]
+            t = best_of(lambda: [list(iter_file(p)) for p in paths])
+            print '%-5s %6.1f MB in %6.2f s, %6.1f MB/s' % (name, mb, t, mb / t)
+        print 'rows agree:', results['file'] == results['mmap']
+
+        def scan(opener):
+            for p in paths:
+                with open(p, 'rb') as f:
+                    for line in extract.logicalLines(opener(f)):
+                        pass
+        for name, opener in [('file', lambda f: f),
+                             ('mmap', lambda f: mmap.mmap(
+                                 f.fileno(), 0, access=mmap.ACCESS_READ))]:
+            t = best_of(lambda: scan(opener))
+            print 'logicalLines only, %-5s %6.1f MB/s' % (name, mb / t)
+    finally:
+        shutil.rmtree(base)
+
+if __name__ == '__main__':
+    main(*[int(a) for a in sys.argv[1:]])
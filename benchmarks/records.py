@@ -0,0 +1,47 @@
+"""
+Size and hashing speed of clean.Record against the earlier plain-object
+version.
+
+    python -m dash13.benchmarks.records [nrecords]
+"""
+
+import sys
+from collections import defaultdict
+
+from .. import clean
+from . import legacy, synth, best_of
+
+def footprint(r):
+    """
+    Return (overhead, total) bytes held by Record r: overhead is the
+    object, its __dict__, values tuple and cached strings; total adds the
+    field strings themselves.
+    """
+    overhead = sys.getsizeof(r) + sys.getsizeof(r.values)
+    if hasattr(r, '__dict__'):
+        overhead += sys.getsizeof(r.__dict__)
+    for name in getattr(type(r), '__slots__', ()):
+        value = getattr(r, name, None)
+        if isinstance(value, str) and value not in r.values:
+            overhead += sys.getsizeof(value)
+    if r._serno is not r.values[4]:
+        overhead += sys.getsizeof(r._serno)
+    return overhead, overhead + sum(sys.getsizeof(v) for v in r.values)
+
+def main(n=200000):
+    data = synth.rows(n)
+    for name, cls in [('plain', legacy.Record), ('slotted', clean.Record)]:
+        recs = [cls(list(r)) for r in data]
+        sizes = [footprint(r) for r in recs[:1000]]
+        print '%-8s %4d bytes/record overhead, %4d total' % (
+            name, sum(o for o, t in sizes) / len(sizes),
+            sum(t for o, t in sizes) / len(sizes))
+        def dedup():
+            ids = defaultdict(list)
+            for r in set(recs):
+                ids[r.recId].append(r)
+        print '%-8s %10.0f records/s through set() and recId grouping' % (
+            name, n / best_of(dedup))
+
+if __name__ == '__main__':
+    main(*[int(a) for a in sys.argv[1:]])
@@ -0,0 +1,56 @@
+"""
+Extract a synthetic corpus keeping rejected lines in extract.Rejects
+rather than a list of weirdos: time and peak memory of each, and the
+Rejects report.  Rejection reasons found in worker processes, by parsing
+rejected lines again, are checked against those found serially.
+
+    python -m dash13.benchmarks.rejects [nfiles [nrecords]]
+"""
+
+import sys
+import time
+import shutil
+import resource
+import tempfile
+import multiprocessing
+
+from .. import extract
+from . import synth
+
+def measure(args):
+    base, kind, processes = args
+    weirdos = extract.Rejects() if kind == 'Rejects' else list()
+    start = time.time()
+    nrows = 0
+    for row in extract.iter_data(base, 'FAU', weirdos, processes):
+        nrows += 1
+    elapsed = time.time() - start
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024.0
+    reasons = getattr(weirdos, 'reasons', None)
+    return elapsed, peak, nrows, len(weirdos), reasons
+
+def main(nfiles=12, nrecords=20000):
+    base = tempfile.mkdtemp()
+    try:
+        synth.writeCorpus(base, nfiles, nrecords)
+        for kind in ['list', 'Rejects']:
+            # each in a fresh process, for its peak resident size
+            pool = multiprocessing.Pool(1, maxtasksperchild=1)
+            elapsed, peak, nrows, nrejects, reasons = pool.apply(
+                measure, [(base, kind, 1)])
+            pool.close()
+            print '%-7s %7d rows, %6d rejected in %5.2f s, %6.1f MB peak' % (
+                kind, nrows, nrejects, elapsed, peak)
+        rejects = extract.Rejects(samplesize=2)
+        for row in extract.iter_data(base, 'FAU', rejects, processes=2):
+            pass
+        print 'reasons agree with 2 processes:', reasons == rejects.reasons
+        rejects = extract.Rejects(samplesize=2)
+        for row in extract.iter_data(base, 'FAU', rejects):
+            pass
+        print rejects.report()
+    finally:
+        shutil.rmtree(base)
+
+if __name__ == '__main__':
+    main(*[int(a) for a in sys.argv[1:]])
@@ -0,0 +1,38 @@
+"""
+Time serial number scrubbing: clean.scrub_serno, one lookup in the
+composed map, against the two lookups it replaced, and clean.scrub_sernos
+and clean.uid_to_eids over a Series against Series.map.  Needs the
+mapping files named in defaults.
+
+    python -m dash13.benchmarks.scrub [nvalues]
+"""
+
+import sys
+import random
+
+import pandas
+
+from .. import clean
+from . import legacy, best_of
+
+def main(n=1000000):
+    rnd = random.Random(0)
+    known = (clean.serno_uid_map().keys() + clean.uid_eid_map().keys() or
+             ['none'])
+    values = [rnd.choice(known) if rnd.random() < .9 else 'X%05d' % i
+              for i in range(n)]
+    series = pandas.Series(values)
+    assert [legacy.scrub_serno(v) for v in values] == map(clean.scrub_serno,
+                                                          values)
+    assert series.map(clean.scrub_serno).equals(clean.scrub_sernos(series))
+    assert series.map(clean.uid_to_eid).equals(clean.uid_to_eids(series))
+    for name, fn in [
+            ('two lookups', lambda: map(legacy.scrub_serno, values)),
+            ('composed', lambda: map(clean.scrub_serno, values)),
+            ('Series.map', lambda: series.map(clean.scrub_serno)),
+            ('scrub_sernos', lambda: clean.scrub_sernos(series)),
+            ('uid_to_eids', lambda: clean.uid_to_eids(series))]:
+        print '%-13s %8d values in %6.3f s' % (name, n, best_of(fn))
+
+if __name__ == '__main__':
+    main(*[int(a) for a in sys.argv[1:]])
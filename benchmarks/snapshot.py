@@ -0,0 +1,55 @@
+"""
+Time writing and loading a cleaned ASCII frame through snapshot (Arrow IPC,
+Parquet) against a pickle and a tilde-delimited CSV, and against rebuilding
+it from the extracted rows.
+
+    python -m dash13.benchmarks.snapshot [nrecords]
+"""
+
+import os
+import sys
+import time
+import shutil
+import tempfile
+
+import pandas
+
+from .. import clean, db_funs, snapshot
+from . import synth, best_of
+from .to_dataframe import COLUMNS
+
+def main(n=500000):
+    rows = synth.rows(n, 0)
+    rebuild = lambda: db_funs.toDataFrame(
+        clean.removeDuplicateIds(clean.getRecords([list(r) for r in rows])),
+        COLUMNS, True)
+    start = time.time()
+    df = rebuild()
+    print 'rebuilt %d records from extracted rows in %.2f s' % (
+        len(df), time.time() - start)
+
+    tmp = tempfile.mkdtemp()
+    try:
+        formats = [('csv', lambda p: df.to_csv(p, sep='~'),
+                    lambda p: pandas.read_csv(p, sep='~', index_col=0)),
+                   ('pickle', lambda p: df.to_pickle(p), pandas.read_pickle)]
+        if snapshot.pyarrow is not None:
+            formats += [('arrow', lambda p: snapshot.save(df, p),
+                         snapshot.load),
+                        ('parquet', lambda p: snapshot.save(df, p + '.parquet'),
+                         lambda p: snapshot.load(p + '.parquet'))]
+        else:
+            print 'pyarrow not installed; snapshots are pickled'
+        for name, write, read in formats:
+            path = os.path.join(tmp, name)
+            w = best_of(lambda: write(path))
+            r = best_of(lambda: read(path))
+            size = sum(os.path.getsize(os.path.join(tmp, f))
+                       for f in os.listdir(tmp) if f.startswith(name))
+            print '%-8s write %6.3f s, load %6.3f s, %7.1f MB' % (
+                name, w, r, size / 2.0**20)
+    finally:
+        shutil.rmtree(tmp)
+
+if __name__ == '__main__':
+    main(*[int(a) for a in sys.argv[1:]])
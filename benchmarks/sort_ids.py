@@ -0,0 +1,57 @@
+"""
+Time sorting by airframe, latest fault first (EI_ID ascending, then
+EVENT_DATE and FAULTNO descending), of Records by clean.sortById and of
+frames by db_funs.sort_by_id, and merging per-file outputs already so
+sorted (clean.mergeSortedById, db_funs.merge_sorted) against sorting them
+all again.  mergeSortedById streams, holding one Record per run.
+
+    python -m dash13.benchmarks.sort_ids [nrecords [nfiles]]
+"""
+
+import sys
+
+import pandas
+
+from .. import clean, db_funs
+from . import legacy, synth, best_of
+from .index import frame
+
+def main(n=500000, nfiles=20):
+    rl = clean.getRecords(synth.rows(n, 0))
+    print 'Records, %d:' % len(rl)
+    print '    %-24s %6.2f s' % ('string key', best_of(
+        lambda: legacy.sortById(rl)))
+    print '    %-24s %6.2f s' % ('packed int key', best_of(
+        lambda: clean.sortById(rl)))
+    runs = [clean.sortById(rl[i::nfiles]) for i in range(nfiles)]
+    joined = sum(runs, [])
+    print '    %-24s %6.2f s' % ('sortById of %d runs' % nfiles,
+                               best_of(lambda: clean.sortById(joined)))
+    print '    %-24s %6.2f s' % ('mergeSortedById', best_of(
+        lambda: list(clean.mergeSortedById(*runs))))
+
+    df = frame(n)
+    cols, ascending = db_funs.SORT_COLUMNS, db_funs.SORT_ASCENDING
+    print 'frame, %d rows:' % len(df)
+    print '    %-24s %6.2f s' % ('sort_values', best_of(
+        lambda: df.sort_values(cols, ascending=ascending, kind='mergesort')))
+    print '    %-24s %6.2f s' % ('sort_by_id', best_of(
+        lambda: db_funs.sort_by_id(df)))
+    parts = [db_funs.sort_by_id(df.iloc[i::nfiles]) for i in range(nfiles)]
+    print '    %-24s %6.2f s' % ('sort_values of %d parts' % nfiles,
+                               best_of(lambda: pandas.concat(parts)
+                                       .sort_values(cols, ascending=ascending,
+                                                    kind='mergesort')))
+    print '    %-24s %6.2f s' % ('merge_sorted', best_of(
+        lambda: db_funs.merge_sorted(parts)))
+    same = (db_funs.sort_by_id(df).index ==
+            df.sort_values(cols, ascending=ascending,
+                           kind='mergesort').index).all()
+    print 'same order as sort_values:', same
+    merged = (db_funs.merge_sorted(parts).index ==
+              pandas.concat(parts).sort_values(
+                  cols, ascending=ascending, kind='mergesort').index).all()
+    print 'merge_sorted same order as sort_values of parts:', merged
+
+if __name__ == '__main__':
+    main(*[int(a) for a in sys.argv[1:]])
@@ -0,0 +1,259 @@
+"""
+Synthetic ASCII report data for the benchmarks.  Lines imitate those in the
+FAU and ACT report dumps, including the quirks extract.handleline has to
+deal with: junk 'U' tokens, split WUC codes, missing WUC, sys code, status
+and completion date, and narratives broken over lines and pages.
+"""
+
+import os
+import random
+
+HEADERS = ['12 JAN 2014   10:22:33',
+           'AIRCRAFT STATUS REPORT - CLOSED FAULTS',
+           '* = RED X',
+           'A/C   MDS    A/C HRS PHASE  + = CIRCLE RED X',
+           'ST FAULT DT # WUC  SYS',
+           'Field #   Name',
+           'AWAAM ADHOC REPORT',
+           '-' * 78,
+           '*' * 78]
+CLOSED_ART = ['  CCC  L      OOO   SSSS EEEEE DDDD',
+              ' C     L     O   O S     E     D   D',
+              ' C     L     O   O  SSS  EEEE  D   D',
+              ' C     L     O   O     S E     D   D',
+              '  CCC  LLLLL  OOO  SSSS  EEEEE DDDD']
+TRAILER = ['TOTAL RECORDS PRINTED: 1234',
+           'TOTAL PAGES PRINTED: 56',
+           'TOTAL FIELDS USED: 9',
+           'ELAPSED TIME FOR REPORT: 00:01:02',
+           'SUMMARY OF ADHOC REPORT']
+WORDS = ('REPLACED HYD PUMP LEAK FOUND AT FITTING OPS CHECK GOOD TORQUED BOLT '
+         'SAFETY WIRED INSPECTED IAW TM CHAFED WIRE HARNESS REPAIRED SEALANT '
+         'APPLIED FILTER CHANGED NO DEFECT NOTED').split()
+MODELS = ['AH64D', 'UH60L', 'UH60M', 'CH47F']
+WUCS = ['04A00', '06B10', '14C02', '29A00']
+STATUSES = list('-*CNXB+/')
+
+def serno(i):
+    return '02%05d' % i
+
+def narrative(rnd, lo=2, hi=14):
+    return ' '.join(rnd.choice(WORDS) for i in range(rnd.randint(lo, hi)))
+
+def date(rnd):
+    return '20%02d%02d%02d' % (rnd.randint(10, 13), rnd.randint(1, 12),
+                               rnd.randint(1, 28))
+
+def recordFields(rnd, nsernos=500):
+    """
+    Return the nine fields of a synthetic record, as in a data line:
+    completion date, WUC, sys code, model, serial no, fault date, fault no,
+    status and narrative.
+    """
+    corr, wuc, sys = date(rnd), rnd.choice(WUCS), rnd.choice('AWEO')
+    model, ei = rnd.choice(MODELS), serno(rnd.randint(0, nsernos - 1))
+    fdate, fno = date(rnd), '%04d' % rnd.randint(1, 40)
+    status, narr = rnd.choice(STATUSES), narrative(rnd)
+    return [corr, wuc, sys, model, ei, fdate, fno, status, narr]
+
+def dataLine(rnd, nsernos=500, fields=None):
+    """
+    Return one synthetic data line, quirks included, for the record with
+    the given fields (from recordFields), or a new one.
+    """
+    if fields is None:
+        fields = recordFields(rnd, nsernos)
+    else:
+        fields = list(fields)
+    wuc = fields[1]
+    k = rnd.random()
+    if k < .05:    # junk 'U' after WUC
+        fields.insert(2, rnd.choice(['U', 'UN', '.']))
+    elif k < .10:  # WUC split in two
+        fields[1:2] = [wuc[:3], wuc[3:]]
+    elif k < .15:  # no WUC, no sys code
+        fields[1:3] = []
+    elif k < .18:  # no WUC, sys code, or status
+        fields[1:3] = []
+        fields[5:6] = []
+    elif k < .23:  # no WUC
+        fields[1:2] = []
+    elif k < .35:  # not yet completed
+        fields[0:1] = []
+    elif k < .38:  # not yet completed, with junk 'U'
+        fields[0:2] = [wuc, 'U']
+    elif k < .40:  # garbage
+        fields = [narrative(rnd, 1, 2)]
+    return ' '.join(fields)
+
+def reportLines(rnd, nrecords, pagelen=50, records=None):
+    """
+    Yield the physical lines of a report file holding nrecords, or the
+    records with the given fields if records is given.  Each record is
+    followed by a blank line, as in the reports: extract.logicalLines takes
+    a data line straight after another for the rest of its narrative.
+    """
+    page = 1
+    for line in HEADERS + CLOSED_ART:
+        yield line
+    yield ''
+    if records is not None:
+        nrecords = len(records)
+    for i in range(nrecords):
+        line = dataLine(rnd, fields=None if records is None else records[i])
+        r = rnd.random()
+        if r < .05:    # narrative broken over two lines
+            yield line
+            yield narrative(rnd, 1, 6)
+        elif r < .07:  # narrative broken over a page break
+            yield line
+            page += 1
+            yield str(page)
+            for h in HEADERS:
+                yield h
+            yield narrative(rnd, 1, 4)
+        else:
+            yield line
+        yield ''
+        if (i + 1) % pagelen == 0:
+            page += 1
+            yield str(page)
+            for h in HEADERS:
+                yield h
+    for line in TRAILER:
+        yield line
+
+def writeReport(path, nrecords, seed=0, records=None):
+    """
+    Write a synthetic report file holding nrecords, or the records with
+    the given fields, to path.
+    """
+    rnd = random.Random(seed)
+    with open(path, 'w') as f:
+        for line in reportLines(rnd, nrecords, records=records):
+            f.write(line + '\n')
+
+def writeCorpus(base, nfiles, nrecords, seed=0):
+    """
+    Write nfiles synthetic FAU, ACT and FAUACT report files, each holding
+    nrecords, into subdirectories of base.  Return list of paths written.
+    """
+    rnd = random.Random(seed)
+    paths = list()
+    for i in range(nfiles):
+        d = os.path.join(base, 'ASCII%02d' % (i % 4))
+        if not os.path.isdir(d):
+            os.makedirs(d)
+        flag = ['FAU', 'ACT', 'FAUACT'][i % 3]
+        path = os.path.join(d, '%s%04d.TXT' % (flag, i))
+        writeReport(path, nrecords, rnd.randint(0, 1 << 30))
+        paths.append(path)
+    return paths
+
+def writePairedCorpus(base, nfiles, nrecords, seed=0, act=.8, repeats=.1):
+    """
+    Write nfiles pairs of synthetic FAU and ACT report files into
+    subdirectories of base, each holding about nrecords, and return list of
+    paths written.  A fraction act of the faults in each FAU file are
+    also in its ACT file, with an action narrative in place of the fault
+    narrative.  A fraction repeats of each file's records are repeated
+    from the file before, as in report dumps that overlap.
+    """
+    rnd = random.Random(seed)
+    paths = list()
+    before = {'FAU': [], 'ACT': []}
+    for i in range(nfiles):
+        d = os.path.join(base, 'ASCII%02d' % (i % 4))
+        if not os.path.isdir(d):
+            os.makedirs(d)
+        fau = [recordFields(rnd) for j in range(nrecords)]
+        act = [f[:8] + [narrative(rnd)] for f in fau if rnd.random() < act]
+        act += [recordFields(rnd) for j in range(nrecords - len(act))]
+        for flag, records in [('FAU', fau), ('ACT', act)]:
+            nrepeats = min(int(nrecords * repeats), len(before[flag]))
+            written = records + rnd.sample(before[flag], nrepeats)
+            rnd.shuffle(written)
+            path = os.path.join(d, '%s%04d.TXT' % (flag, i))
+            writeReport(path, 0, rnd.randint(0, 1 << 30), written)
+            paths.append(path)
+            before[flag] = records
+    return paths
+
+def pairedCorpusSize(nfiles, nrecords, repeats=.1):
+    """
+    Return number of records writePairedCorpus writes in the FAU files,
+    as in the ACT files, repeats included.
+    """
+    return nfiles * nrecords + (nfiles - 1) * int(nrecords * repeats)
+
+def sampleLines(n, seed=0):
+    """Return list of n physical report lines, as for classifier timing."""
+    rnd = random.Random(seed)
+    lines = list()
+    while len(lines) < n:
+        lines.extend(reportLines(rnd, 200))
+    return lines[:n]
+
+def rows(n, seed=0, repeats=.2):
+    """
+    Return n rows as extract.iter_data yields them, from synthetic data
+    lines that parse.  A fraction repeats of them are copies of others, as
+    from overlapping report files.
+    """
+    from ..extract import parseline
+    rnd = random.Random(seed)
+    ret = list()
+    nunique = n - int(n * repeats)
+    while len(ret) < nunique:
+        values, weird = parseline(dataLine(rnd))
+        if values is not None:
+            ret.append(values + ['FAU%04d.TXT' % (len(ret) // 5000),
+                                 str(len(ret) % 5000)])
+    return ret + [list(rnd.choice(ret)) for i in range(n - nunique)]
+
+def writeDash13Xml(path, nrecords, seed=0):
+    """
+    Write a synthetic DASH13.DBF XML export holding nrecords to path, as
+    d13_dbf reads it.
+    """
+    rnd = random.Random(seed)
+    with open(path, 'w') as f:
+        f.write("<?xml version='1.0' encoding='UTF-8'?>\n<dataroot>\n")
+        for i in range(nrecords):
+            f.write('<DASH13>'
+                    '<FAULTDAT>%s</FAULTDAT><FAULTNO>%d</FAULTNO>'
+                    '<UNIT_ID>%s</UNIT_ID><SYS_CODE>%s</SYS_CODE>'
+                    '<FAULT>%s</FAULT></DASH13>\n' % (
+                        date(rnd), rnd.randint(1, 9999), serno(i % 500),
+                        rnd.choice('AEOW'), narrative(rnd)))
+        f.write('</dataroot>\n')
+
+def writeDash13Csv(path, nrecords, seed=0):
+    """
+    Write a synthetic DASH13.DBF delimited text export holding nrecords to
+    path, as d13_dbf reads it.
+    """
+    rnd = random.Random(seed)
+    with open(path, 'w') as f:
+        f.write('FAULTDAT ~ FAULTNO ~ UNIT_ID ~ SYS_CODE ~ FAULT\n')
+        for i in range(nrecords):
+            f.write('%s~%04d~%s~%s~ %s \n' % (
+                date(rnd), rnd.randint(1, 9999), serno(i % 500),
+                rnd.choice('AEOW'), narrative(rnd)))
+
+def vmepFrame(nrecords, seed=0):
+    """
+    Return pandas.DataFrame of nrecords synthetic VMEP records, with the
+    columns db_funs.vmep_to_df expects of the workbook.
+    """
+    import pandas
+    rnd = random.Random(seed)
+    return pandas.DataFrame({
+        'FAULTDAT': [date(rnd) for i in range(nrecords)],
+        'FAULTNO': [rnd.randint(1, 9999) for i in range(nrecords)],
+        'UNIT_ID': [serno(rnd.randint(0, 499)) for i in range(nrecords)],
+        'SYS_CODE': [rnd.choice('AEOW') for i in range(nrecords)],
+        'FAULT': [narrative(rnd) for i in range(nrecords)],
+        'ACTION': [narrative(rnd) for i in range(nrecords)]},
+        columns=['FAULTDAT', 'FAULTNO', 'UNIT_ID', 'SYS_CODE', 'FAULT',
+                 'ACTION'])
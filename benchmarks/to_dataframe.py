@@ -0,0 +1,34 @@
+"""
+Time db_funs.toDataFrame, with and without typed columns, against the
+DataFrame.from_items version, and compare the frames' memory use.
+
+    python -m dash13.benchmarks.to_dataframe [nrecords]
+"""
+
+import sys
+import warnings
+
+import pandas
+
+from .. import clean, db_funs
+from . import legacy, synth, best_of
+
+COLUMNS = ['REC_ID', 'CORRDATE', 'WUC', 'SYS_CODE', 'AC_MODL', 'EI_ID',
+           'FAULTDAT', 'FAULTNO', 'SS', 'FAULT']
+
+def main(n=500000):
+    records = clean.removeDuplicateIds(clean.getRecords(synth.rows(n, 0, 0)))
+    builders = [('typed', lambda: db_funs.toDataFrame(records, COLUMNS, True)),
+                ('strings', lambda: db_funs.toDataFrame(records, COLUMNS))]
+    if hasattr(pandas.DataFrame, 'from_items'):
+        builders.append(('from_items',
+                         lambda: legacy.toDataFrame(records, COLUMNS)))
+    warnings.simplefilter('ignore', FutureWarning)  # from_items
+    for name, fn in builders:
+        t = best_of(fn)
+        mb = fn().memory_usage(deep=True).sum() / 2.0**20
+        print '%-10s %8d records in %6.2f s, %7.1f MB' % (name, len(records),
+                                                          t, mb)
+
+if __name__ == '__main__':
+    main(*[int(a) for a in sys.argv[1:]])
@@ -0,0 +1,46 @@
+"""
+Time reading a sheet of an Excel workbook with db_funs.read_workbook:
+parsing it, parsing it and writing its sidecar, and loading the sidecar,
+whole and for a few columns.  Needs an Excel writer and reader for pandas
+(e.g. openpyxl and xlrd).
+
+    python -m dash13.benchmarks.workbook [nrecords]
+"""
+
+import os
+import sys
+import shutil
+import tempfile
+
+from .. import db_funs
+from . import synth, best_of
+
+def main(n=50000):
+    tmp = tempfile.mkdtemp()
+    try:
+        path = os.path.join(tmp, 'vmep.xlsx')
+        df = synth.vmepFrame(n)
+        df.to_excel(path, sheet_name='VMEP', index=False)
+        sidecar = db_funs.sidecar_path(path, 'VMEP')
+        cols = ['FAULTDAT', 'FAULTNO', 'UNIT_ID']
+
+        def first():
+            if os.path.exists(sidecar):
+                os.remove(sidecar)
+            return db_funs.read_workbook(path, 'VMEP')
+        for name, fn in [
+                ('parse', lambda: db_funs.read_workbook(path, 'VMEP',
+                                                        cache=False)),
+                ('parse + sidecar', first),
+                ('sidecar', lambda: db_funs.read_workbook(path, 'VMEP')),
+                ('sidecar, 3 cols',
+                 lambda: db_funs.read_workbook(path, 'VMEP', cols))]:
+            print '%-16s %7d rows in %7.3f s' % (name, n, best_of(fn, 2))
+        parsed = db_funs.read_workbook(path, 'VMEP', cache=False)
+        print 'sidecar equals parse:', db_funs.read_workbook(
+            path, 'VMEP').equals(parsed)
+    finally:
+        shutil.rmtree(tmp)
+
+if __name__ == '__main__':
+    main(*[int(a) for a in sys.argv[1:]])
@@ -3,60 +3,137 @@ Cull and clean up raw ASCII data.
 """
 
 
+import heapq
 from . import defaults as DEF
 
 
 ############################################
 # serial number scrub mappings and scrubber routine
 
-_serno_uid_map = dict()  # serial no to uid map
-with open(DEF.__serno_to_uid__, 'r') as f:
-    for line in f:
-        line = line.split()
-        _serno_uid_map[line[0]] = line[2]
+# The mapping files are read on first use, not on import, and the two
+# mappings composed into one so that scrubbing is a single lookup.
+
+_serno_uid_map = None  # serial no to uid map
+_uid_eid_map = None  # uid to eid map
+_serno_eid_map = None  # serial no or uid to eid map
+
+def _readMap(path, col):
+    m = dict()
+    with open(path, 'r') as f:
+        for line in f:
+            line = line.split()
+            m[line[0]] = line[col]
+    return m
+
+def serno_uid_map():
+    """Return dict of serial no to uid, from DEF.__serno_to_uid__."""
+    global _serno_uid_map
+    if _serno_uid_map is None:
+        _serno_uid_map = _readMap(DEF.__serno_to_uid__, 2)
+    return _serno_uid_map
+
+def uid_eid_map():
+    """Return dict of uid to eid, from DEF.__uid_to_ei__."""
+    global _uid_eid_map
+    if _uid_eid_map is None:
+        _uid_eid_map = _readMap(DEF.__uid_to_ei__, 1)
+    return _uid_eid_map
+
+def serno_eid_map():
+    """
+    Return dict giving scrub_serno(x) for each x that scrub_serno changes:
+    serial nos mapped to uids and then, where possible, to eids, and uids
+    mapped to eids.
+    """
+    global _serno_eid_map
+    if _serno_eid_map is None:
+        uid_eid = uid_eid_map()
+        m = dict(uid_eid)
+        for serno, uid in serno_uid_map().iteritems():
+            m[serno] = uid_eid.get(uid, uid)
+        _serno_eid_map = m
+    return _serno_eid_map
 
 def serno_to_uid(serno):
-    return (_serno_uid_map[serno] if
-            serno in _serno_uid_map else
-            serno)
-
-_uid_eid_map = dict()  # uid to eid map
-with open(DEF.__uid_to_ei__, 'r') as f:
-    for line in f:
-        line = line.split()
-        _uid_eid_map[line[0]] = line[1]
+    return serno_uid_map().get(serno, serno)
 
 def uid_to_eid(uid):
-    return (_uid_eid_map[uid] if
-            uid in _uid_eid_map else
-            uid)
+    return uid_eid_map().get(uid, uid)
 
 def scrub_serno(serno):
-    return uid_to_eid(serno_to_uid(serno))
+    m = _serno_eid_map
+    if m is None:
+        m = serno_eid_map()
+    return m.get(serno, serno)
+
+def mapValues(values, mapping):
+    """
+    Return values, a pandas.Series or array, with each value found in dict
+    mapping replaced by what it maps to.  Each distinct value is looked up
+    once.  A Series is returned for a Series, with the same index.
+    """
+    # imported here so that importing clean does not import pandas
+    import numpy
+    import pandas
+    codes, uniques = pandas.factorize(values)
+    # a missing value has code -1, which picks the NaN appended here
+    mapped = numpy.array([mapping.get(u, u) for u in uniques] + [numpy.nan],
+                         dtype=object)[codes]
+    if isinstance(values, pandas.Series):
+        return pandas.Series(mapped, index=values.index, name=values.name)
+    return mapped
+
+def scrub_sernos(sernos):
+    """scrub_serno of each of sernos, a pandas.Series or array."""
+    return mapValues(sernos, serno_eid_map())
+
+def uid_to_eids(uids):
+    """uid_to_eid of each of uids, a pandas.Series or array."""
+    return mapValues(uids, uid_eid_map())
 #
 ############################################
 
 
+# names of the values in a Record, in order.  The first 9 are its wholerec
+FIELDS = ['CORR_DATE_TIME', 'WUC', 'SYS_CODE', 'MODEL', 'EI_ID',
+          'EVENT_DATE', 'EVENT_NO', 'STATUS', 'NARR', 'filename', 'lineno']
+
 class Record(object):
+    """
+    One extracted data line.  Slotted, to keep the millions of these we
+    hold small; recId and the hash are worked out once, when built.
+    """
+    __slots__ = ('values', '_serno', 'recId', '_hash', '_sortableId')
+
     def __init__(self, l):
         if len(l) != 11:  # quick check
             raise RuntimeError("Cannot create record from list: %s" % str(l))
         self._serno = str(l[4])
         l[4] = scrub_serno(l[4])
-        self.values = tuple(l)
+        self._setValues(tuple(l))
+
+    def _setValues(self, values):
+        self.values = values
+        self.recId = '_'.join([values[5],  # EVENT_DATE
+                               values[6],  # EVENT_NO
+                               values[4],  # EI_ID
+                               values[2]   # SYS_CODE
+                               ])
+        self._hash = hash(values[:-2])
+        self._sortableId = None
+
+    def __getstate__(self):
+        return self.values, self._serno
+
+    def __setstate__(self, state):
+        values, self._serno = state
+        self._setValues(values)
 
     @property
     def wholerec(self):
         """"wholerec is all values except filename and line no"""
         return self.values[:-2]
     @property
-    def recId(self):
-        return '_'.join([self.EVENT_DATE,
-                         self.EVENT_NO,
-                         self.EI_ID,
-                         self.SYS_CODE
-                         ])
-    @property
     def CORR_DATE_TIME(self):
         return self.values[0]
     @property
@@ -99,15 +176,32 @@ class Record(object):
         return str(self.wholerec)
 
     def __hash__(self):
-        return hash(''.join(self.wholerec))
+        return self._hash
 
     def __eq__(self, other):
-        return hash(self) == hash(other)
-        #return ''.join(self.wholerec) == ''.join(other.wholerec)
+        if not isinstance(other, Record):
+            return NotImplemented
+        return (self._hash == other._hash and
+                self.values[:-2] == other.values[:-2])
+
+    def __ne__(self, other):
+        return not self == other
 
     @property
     def sortableId(self):
-        ''.join([self.EI_ID, self.EVENT_DATE, self.EVENT_NO])
+        """
+        Key putting Records in sortById order: EI_ID ascending, then
+        EVENT_DATE and EVENT_NO descending, as numbers.
+        """
+        if self._sortableId is None:
+            self._sortableId = (self.values[4],
+                                -_number(self.values[5]),
+                                -_number(self.values[6]))
+        return self._sortableId
+
+def _number(s):
+    """Return int of digit string s, or -1, which sorts last when negated."""
+    return int(s) if s.isdigit() else -1
 
 
 
@@ -132,28 +226,86 @@ def getRecords(fromloc):
     @rtype:  list
     @return: extracted ascii data as list of Records
     """
-    ret = list()
+    return list(iterRecords(fromloc))
+
+def iterRecords(fromloc):
+    """
+    Generator version of getRecords: build Records from fromloc one at a
+    time.
+
+    @type  fromloc: str or iterable
+    @param fromloc: location of extracted data, as csv filename or iterable
+                    of value lists (e.g. extract.iter_data)
+    @rtype:  generator
+    @return: Records, in the order of fromloc
+    """
     try:
         fromfile = open(fromloc, 'r')
-        ret = [Record(line.split(DEF.__ascii_csv_delim__)) for
-               line in
-               fromfile]
-        fromfile.close()
     except TypeError:
-        ret = [Record(valuelist) for valuelist in fromloc]
-
-    return ret
+        for valuelist in fromloc:
+            yield Record(valuelist)
+        return
+    with fromfile:
+        for line in fromfile:
+            yield Record(line.split(DEF.__ascii_csv_delim__))
 
 def sortById(recList):
     """
-    Sort recList by ei id, event date, event number.
+    Sort recList by ei id, then latest event date and event number first,
+    as db_funs.sort_by_id sorts frames.  Records with equal keys keep their
+    order.
+
+    Each distinct ei id, event date and event number is ranked once, and
+    the ranks, then the Record's position, packed into an int per Record,
+    so plain ints are sorted, with no key function, strings or tuples.
     
     @type  recList: list
     @param recList: list of Records to be sorted
     @rtype: list
     @return: recList sorted by ei id, event date, event number
     """
-    return sorted(recList, key=lambda rec : rec.sortableId)
+    recList = list(recList)
+    values = [r.values for r in recList]
+    eis = dict((s, i) for i, s in enumerate(sorted(set(v[4] for v in
+                                                       values))))
+    dates, ndates = _descendingRanks(set(v[5] for v in values))
+    nos, nnos = _descendingRanks(set(v[6] for v in values))
+    n = len(values)
+    keys = [((eis[v[4]] * ndates + dates[v[5]]) * nnos + nos[v[6]]) * n + i
+            for i, v in enumerate(values)]
+    keys.sort()
+    return [recList[k % n] for k in keys]
+
+def _descendingRanks(strings):
+    """
+    Return dict of each of strings : its rank, greatest number first and
+    strings that are not numbers last, as in Record.sortableId, and the
+    number of ranks.
+    """
+    numbers = dict((s, _number(s)) for s in strings)
+    ranks = dict((n, i) for i, n in enumerate(sorted(set(numbers.values()),
+                                                     reverse=True)))
+    return dict((s, ranks[n]) for s, n in numbers.iteritems()), len(ranks)
+
+def mergeSortedById(*runs):
+    """
+    Yield the Records of runs (per-file outputs, say), each already in
+    sortById order, in sortById order, without sorting them again.  As
+    sortById of the runs joined in order: Records with equal keys come out
+    in the order of their runs.
+
+    @type  runs: iterables
+    @param runs: Records, as lists or streams, each sorted by sortById
+    @rtype: generator
+    """
+    keyed = [_keyedRun(i, run) for i, run in enumerate(runs)]
+    for key, i, j, r in heapq.merge(*keyed):
+        yield r
+
+def _keyedRun(i, run):
+    # run index and position break ties, so Records are never compared
+    for j, r in enumerate(run):
+        yield r.sortableId, i, j, r
 
 def removeDuplicateRecords(rl):
     """
@@ -167,36 +319,117 @@ def removeDuplicateRecords(rl):
     """
     return list(set(rl))
 
+def iterDistinctRecords(rl):
+    """
+    Generator version of removeDuplicateRecords: pass on each Record of rl
+    the first time it is seen.  Only the distinct Records are held.
+    """
+    seen = set()
+    for r in rl:
+        if r not in seen:
+            seen.add(r)
+            yield r
+
 def removeBlankNarrEvent(rl):
     """Remove records with blank CORR_DATE_TIME or NARR from rl."""
-    return [r for r in rl if r.CORR_DATE_TIME and r.NARR]
+    return list(iterNonBlankNarrEvent(rl))
 
-from collections import defaultdict
-def removeDuplicateIds(rl, priority='byEventDate', check=False):
+def iterNonBlankNarrEvent(rl):
+    """Generator version of removeBlankNarrEvent."""
+    for r in rl:
+        if r.CORR_DATE_TIME and r.NARR:
+            yield r
+
+def removeDuplicateIds(rl, priority='byEventDate', check=False, audit=None):
     """
     Remove duplicate recordIds.
+
+    Records are taken one at a time, keeping only the best so far for each
+    recordId, so the records need not all be held at once.  Of records
+    ranked equal, the first is kept.
     
-    @type  rl: list
-    @param rl: list of Records
+    @type  rl: iterable
+    @param rl: Records, as list or stream (e.g. from iterRecords)
     @type  priority: str
     @param priority: indicates priority by which Records with same recordIds
                      should be culled.  May be either 'byEventDate' or
                      'byNarr'.  'byEventDate' is default.
     @type  check: boolean
     @param check: indicates whether to record discarded Records (True) or
-                  not (False).  False is default.
+                  not (False), to discarded_eventNarr or discarded_narrEvent
+                  unless audit is given.  False is default.
+    @type  audit: str or callable
+    @param audit: file to which, or function f(selected, discarded) to
+                  which, each Record discarded that ties with the one
+                  selected on the first criterion of <priority> is
+                  reported, once all of rl has been seen (see bestById).
     @rtype: list
     @return: list of Records with distinct recordIds.  Records are culled
              according to <priority>
     """
     if priority not in ['byNarr', 'byEventDate']:
         raise RuntimeError("removeDuplicateIds requires priority argument 'byNarr' or 'byEventDate'")
+    if check and audit is None:
+        audit = (discarded_narrEvent if priority == 'byNarr' else
+                 discarded_eventNarr)
+    sink, close = auditSink(audit, priority)
+    try:
+        return bestById(rl, priority, sink).values()
+    finally:
+        if close is not None:
+            close()
 
-    ret = defaultdict(list)
+def recordRank(record, priority):
+    """
+    Return key ranking <record> among Records with its recordId under
+    <priority>, as for removeDuplicateIds: the greatest is kept.
+    """
+    if priority == 'byNarr':
+        return len(record.NARR), int(record.EVENT_DATE)
+    return int(record.EVENT_DATE), len(record.NARR)
+
+def bestById(rl, priority, sink=None):
+    """
+    Return dict of recordId to best of Records rl with that recordId under
+    <priority>, the first of equals.  sink, if given, is called as
+    sink(selected, discarded) for each Record discarded that ties with the
+    one selected on the first criterion of <priority>, as
+    external.iterBestById reports them.  A later Record may yet beat the
+    best so far, so no choice is final until all of rl has been seen: the
+    tied Records are held until then, and reported recordId by recordId,
+    best first.  With sink None nothing more than the best is held.
+    """
+    best = dict()
+    ranks = dict()  # recordId : rank of best, once it has had a rival
+    ties = dict()   # recordId : Records tying with best on first criterion
     for record in rl:
-        ret[record.recId].append(record)  # build dict from records by recordId
-    thinLists(ret, priority, check)
-    return ret.values()
+        recId = record.recId
+        current = best.get(recId)
+        if current is None:
+            best[recId] = record
+            continue
+        rank = ranks.get(recId)
+        if rank is None:
+            rank = recordRank(current, priority)
+        challenger = recordRank(record, priority)
+        if challenger > rank:
+            best[recId] = record
+            ranks[recId] = challenger
+            if sink is not None:
+                # losers to the old best tie with the new one only if it
+                #   ties with the old best
+                tied = ties.pop(recId, [])
+                if challenger[0] == rank[0]:
+                    ties[recId] = [current] + tied
+        else:
+            ranks[recId] = rank
+            if sink is not None and challenger[0] == rank[0]:
+                ties.setdefault(recId, []).append(record)
+    for recId, tied in ties.items():
+        tied.sort(key=lambda r: recordRank(r, priority), reverse=True)
+        for record in tied:
+            sink(best[recId], record)
+    return best
 
 #########################################################
 # for testing
@@ -213,66 +446,42 @@ by 1) latter eventDate, 2) length of narrative field
 #
 ########################################################
 
+def auditSink(audit, priority):
+    """
+    Return (sink, close) for the audit argument of removeDuplicateIds: a
+    function sink(selected, discarded), or None if audit is None, and a
+    function to call when done, or None.  A str audit names a file, which
+    is written as each pair is reported, laid out as the original
+    writeChoices wrote it: one Selected block per recordId, then the
+    Records discarded for tying with it.  (writeChoices listed every other
+    Record with the recordId, tied or not, once the top two tied.)
+    """
+    if audit is None or callable(audit):
+        return audit, None
+    fout = open(audit, 'w')
+    fout.write(narrEvent_text if priority == "byNarr" else
+               eventNarr_text)
+    last = [None]  # Record last selected
+    def sink(selected, discarded):
+        if selected is not last[0]:
+            fout.write("\nSelected:\n%s\n" % str(selected))
+            fout.write("Discarded:\n")
+            last[0] = selected
+        fout.write(str(discarded) + '\n')
+    return sink, fout.close
+
 def thinLists(d, priority, check):
-    ###############################################################
-    # some helper function definitions for cleanliness
-    def recCmpNarr(rec1, rec2):
-        diff = len(rec1.NARR) - len(rec2.NARR)
-        return (int(rec1.EVENT_DATE) - int(rec2.EVENT_DATE) if
-                not diff else diff)
-
-    def recCmpEvent(rec1, rec2):
-        diff = int(rec1.EVENT_DATE) - int(rec2.EVENT_DATE)
-        return (diff if diff else
-                len(rec1.NARR) - len(rec2.NARR))
-    
-    def sortRecs(rl, priority):
-        return sorted(rl,
-                      cmp=(recCmpNarr if priority == 'byNarr' else
-                           recCmpEvent),
-                      reverse=True)
-
-    def topRec(rl, priority):
-        return sortRecs(rl, priority)[0]
-
-    def writeChoices(f, rl, priority):
-        if len(rl) > 1:
-            rl = sortRecs(rl, priority)
-            if (priority == 'byNarr' and
-                len(rl[0].NARR) == len(rl[1].NARR)):
-                f.write("\nSelected:\n%s\n" %(str(rl[0])))
-                f.write("Discarded:\n")
-                for r in rl[1:]:
-                    f.write(str(r) + '\n')
-            elif (priority == 'byEventDate' and
-                rl[0].EVENT_DATE == rl[1].EVENT_DATE):
-                f.write("\nSelected:\n%s\n" %(str(rl[0])))
-                f.write("Discarded:\n")
-                for r in rl[1:]:
-                    f.write(str(r) + '\n')
-    #
-    ###############################################################
-
-    ###############################################################
-    # if checking choices, we will need to write them to an appropriate file
-    if check:
-        fout = open(discarded_narrEvent if priority == "byNarr" else
-                    discarded_eventNarr,
-                    'w')
-        fout.write(narrEvent_text if priority == "byNarr" else
-                   eventNarr_text)
-        
-    ###############################################################
-    # core of thinList function
-    for key in d.keys():
-        selected = topRec(d[key], priority)
-        if check:
-            writeChoices(fout, d[key], priority)
-        d[key] = selected
-
-    if check:
-        fout.close()
-
-
-    # end of thinLists function
+    """
+    Replace each list of Records in dict <d> (keyed by their recordId) with
+    the best of them under <priority>, as removeDuplicateIds.
+    """
+    sink, close = auditSink((discarded_narrEvent if priority == "byNarr" else
+                             discarded_eventNarr) if check else None,
+                            priority)
+    try:
+        for key in d.keys():
+            d[key] = bestById(d[key], priority, sink).values()[0]
+    finally:
+        if close is not None:
+            close()
 
@@ -5,72 +5,190 @@ Created on Sat Feb 01 16:22:14 2014
 @author: Huston Bokinsky
 """
 
-import xml.etree.ElementTree as et
+# this import syntax only necessary for Python 2.x
+# in Python 3.x, etree automatically imports cElementTree
+#  by preference
+try:
+    import xml.etree.cElementTree as et
+except ImportError:
+    import xml.etree.ElementTree as et
+import csv
 import pandas
 
 from . import defaults as DEF
 
 
-def csvToDataFrame():
-    dicts = list()
-    with open(DEF.__dash13_csv__, 'r') as data:
-        keys = data.readline().split(DEF.__ascii_csv_delim__)
-        keys = [k.strip() for k in keys]
-        print keys, '\n\n'
-        for lineno, line in enumerate(data, 2):
-            values = line.split(DEF.__ascii_csv_delim__)
-            values = [v.strip() for v in values]
-            temp = dict(zip(keys, values))
-            #print temp['FAULTDAT'], temp['FAULTNO'], temp['UNIT_ID'], temp['SYS_CODE']
-            try:
-                temp['REC_ID'] = '_'.join([ temp['FAULTDAT'],
-                                        temp['FAULTNO'],
-                                        temp['UNIT_ID'],
-                                        temp['SYS_CODE']
-                                      ])
-            except KeyError:
+##########################################################################
+# DASH13.DBF exported as delimited text, with a header line of field
+# names.  Every field is read as a string, so that e.g. FAULTNO keeps any
+# leading zeros in REC_ID, and surrounding whitespace is stripped.
+#
+RECID_FIELDS = ['FAULTDAT', 'FAULTNO', 'UNIT_ID', 'SYS_CODE']
+
+def iterCsvChunks(path=None, chunksize=None):
+    """
+    Yield pandas.DataFrames of up to chunksize records (all records if
+    None) from the DASH13 CSV export at path (DEF.__dash13_csv__ by
+    default), each with a REC_ID column and columns in sorted order.
+
+    A row too short to hold all the REC_ID fields is reported with its line
+    number, and KeyError raised, as csvToDataFrame always has.  Other fields
+    missing from the end of a short row read as empty strings.
+    """
+    if path is None:
+        path = DEF.__dash13_csv__
+    delim = DEF.__ascii_csv_delim__
+    with open(path, 'r') as data:
+        keys = [k.strip() for k in data.readline().split(delim)]
+        first = data.readline()
+    if not first:
+        return
+    for k in RECID_FIELDS:
+        if k not in keys:
+            print 2, dict(zip(keys, [v.strip() for v in first.split(delim)]))
+            raise KeyError(k)
+    last = max(keys.index(k) for k in RECID_FIELDS)
+    reader = pandas.read_csv(path, sep=delim, header=None, skiprows=1,
+                             names=range(len(keys)), dtype=str, na_filter=False,
+                             quoting=csv.QUOTE_NONE, skip_blank_lines=False,
+                             iterator=True)
+    while True:
+        try:
+            chunk = reader.get_chunk(chunksize)
+        except StopIteration:
+            return
+        if chunk.empty:
+            return
+        chunk.columns = keys
+        for k in keys:  # plain loop, as Series.str.strip is much slower
+            chunk[k] = [v.strip() for v in chunk[k].values]
+        # a field missing from a short row reads as empty, so only rows
+        # with an empty REC_ID field need to be checked against the file
+        empty = (chunk[RECID_FIELDS] == '').any(axis=1)
+        if empty.any():
+            checkShortRows(path, keys, last, chunk.index[empty.values] + 2)
+        chunk['REC_ID'] = chunk['FAULTDAT'].str.cat(
+            [chunk['FAULTNO'], chunk['UNIT_ID'], chunk['SYS_CODE']], sep='_')
+        yield chunk.reindex(columns=sorted(chunk.columns))
+        if chunksize is None:
+            return
+
+def checkShortRows(path, keys, last, linenos):
+    """
+    Report the first of the lines at linenos of file at path that has no
+    field at index last, raising KeyError as csvToDataFrame does.
+    """
+    wanted = set(linenos)
+    delim = DEF.__ascii_csv_delim__
+    with open(path, 'r') as data:
+        for lineno, line in enumerate(data, 1):
+            if lineno not in wanted:
+                continue
+            values = [v.strip() for v in line.split(delim)]
+            if len(values) <= last:
+                temp = dict(zip(keys, values))
                 print lineno, temp
-                raise
-            dicts.append(temp)
-    return pandas.DataFrame(dicts)
+                raise KeyError([k for k in RECID_FIELDS
+                                if keys.index(k) >= len(values)][0])
+            if lineno >= linenos[-1]:
+                return
 
+def csvToDataFrame(path=None, chunksize=None):
+    """
+    Return pandas.DataFrame of the records in the DASH13 CSV export at path
+    (DEF.__dash13_csv__ by default).  Given chunksize, the file is parsed
+    that many records at a time, which bounds the parser's working memory.
+    """
+    frames = list(iterCsvChunks(path, chunksize))
+    if not frames:
+        return pandas.DataFrame()
+    if len(frames) == 1:
+        return frames[0]
+    return pandas.concat(frames)
 
-def xmlToDataFrame():
-    dicts = list()
-    tree = et.parse(DEF.__dash13_xml__)
-    root = tree.getroot()
-    for record in root:
-        rec = dict.fromkeys(DEF.__dash13_fields__, '')
-        for field in record:
-            rec[field.tag.strip()] = field.text
-        rec['REC_ID'] = '_'.join([ rec['FAULTDAT'],
-                                   rec['FAULTNO'],
-                                   rec['UNIT_ID'],
-                                   rec['SYS_CODE']
-                                 ])
-        #index = rec.pop('REC_ID')
-        #dicts[index] = rec
-        dicts.append(rec)
-    #return pandas.DataFrame.from_dict(dicts, orient='index')
-    return pandas.DataFrame(dicts)
-
-def xmlToDicts():
-    dicts = list()
-    tree = et.parse(DEF.__dash13_xml__)
-    root = tree.getroot()
-    for record in root:
+
+##########################################################################
+# DASH13.DBF exported as XML: a root element holding one element per
+# record, whose children are the record's fields.  The document is read
+# incrementally, each record being dropped from the tree once it has been
+# built, so memory does not grow with the size of the export.
+#
+CHUNKSIZE = 50000
+MISSING = float('nan')  # as pandas gives fields absent from a record
+
+def iterXmlRecords(path=None):
+    """
+    Yield a dict of field values for each record in the DASH13 XML export
+    at path (DEF.__dash13_xml__ by default), with its REC_ID.
+
+    @type  path: str
+    @rtype: generator of dict
+    """
+    if path is None:
+        path = DEF.__dash13_xml__
+    depth = 0
+    root = None
+    for event, elem in et.iterparse(path, events=('start', 'end')):
+        if event == 'start':
+            if root is None:
+                root = elem
+            depth += 1
+            continue
+        depth -= 1
+        if depth != 1:
+            continue
         rec = dict.fromkeys(DEF.__dash13_fields__, '')
-        for field in record:
+        for field in elem:
             rec[field.tag.strip()] = field.text
         rec['REC_ID'] = '_'.join([ rec['FAULTDAT'],
                                    rec['FAULTNO'],
                                    rec['UNIT_ID'],
                                    rec['SYS_CODE']
                                  ])
-        #index = rec.pop('REC_ID')
-        #dicts[index] = rec
-        dicts.append(rec)
-    #return pandas.DataFrame.from_dict(dicts, orient='index')
-    return dicts
+        root.clear()
+        yield rec
+
+def iterXmlChunks(path=None, chunksize=CHUNKSIZE):
+    """
+    Yield records from iterXmlRecords(path) as dicts of columns, each
+    holding up to chunksize records.
+
+    @rtype: generator of dict: field name -> list of values
+    """
+    columns = dict()
+    n = 0
+    for rec in iterXmlRecords(path):
+        for key in rec:
+            if key not in columns:
+                columns[key] = [MISSING] * n  # field new in this chunk
+        for key, column in columns.iteritems():
+            column.append(rec.get(key, MISSING))
+        n += 1
+        if n == chunksize:
+            yield columns
+            columns = dict()
+            n = 0
+    if n:
+        yield columns
 
+def xmlToDataFrame(path=None, chunksize=CHUNKSIZE):
+    """
+    Return pandas.DataFrame of the records in the DASH13 XML export at path
+    (DEF.__dash13_xml__ by default), with columns in sorted order.  The
+    frame is built chunksize records at a time.
+    """
+    frames = [pandas.DataFrame(columns)
+              for columns in iterXmlChunks(path, chunksize)]
+    if not frames:
+        return pandas.DataFrame()
+    names = sorted(set().union(*[f.columns for f in frames]))
+    if len(frames) == 1:
+        return frames[0].reindex(columns=names)
+    return pandas.concat([f.reindex(columns=names) for f in frames],
+                         ignore_index=True)
 
+def xmlToDicts(path=None):
+    """Return list of dicts, one per record, as iterXmlRecords(path)."""
+    return list(iterXmlRecords(path))
+#
+##########################################################################
@@ -5,21 +5,133 @@ Created on Thu Jan 30 17:57:02 2014
 @author: Huston Bokinsky
 """
 
+import os
+import re
+import sys
+import hashlib
+import multiprocessing
+
+import numpy
 import pandas
 from . import defaults as DEF
 from . import clean as clean
 from . import extract as extract
+from . import external as external
+from .manifest import Manifest
+from . import snapshot as snapshot
+from .snapshot import Store
+from .metrics import Metrics, NO_METRICS
 
-def toDataFrame(rl, col_names):
+def toDataFrame(rl, col_names, typed=False):
     """
     Return pandas.DataFrame indexed by recId from Record list.
     @type  rl: list
     @param rl: list of Records
+    @type  col_names: list
+    @param col_names: names for the recId column and the 9 wholerec fields
+    @type  typed: bool
+    @param typed: give low-cardinality fields categorical dtypes, EVENT_NO
+                  an integer one and the date fields datetimes, as
+                  typedColumn.  Otherwise all columns are strings.
     @rtype: pandas.DataFrame
     """
-    d = [(r.recId, tuple([r.recId]) + r.wholerec) for r in rl]
-    return pandas.DataFrame.from_items(d, orient='index',
-            columns=col_names)
+    recIds = list()
+    values = list()
+    for r in rl:
+        recIds.append(r.recId)
+        values.append(r.values)
+    # from_records transposes the value tuples into columns in one go
+    fields = pandas.DataFrame.from_records(values, columns=clean.FIELDS)
+    data = {col_names[0]: recIds}
+    for i, name in enumerate(col_names[1:]):
+        column = fields[clean.FIELDS[i]].values
+        data[name] = typedColumn(i, column) if typed else column
+    return pandas.DataFrame(data, index=recIds, columns=col_names)
+
+# dtypes of the Record fields, by position, in typed frames
+categorical_fields = [2, 3, 4, 7]  # SYS_CODE, MODEL, EI_ID, STATUS
+integer_fields = [6]               # EVENT_NO
+date_fields = [0, 5]               # CORR_DATE_TIME, EVENT_DATE
+
+def typedColumn(i, values):
+    """Return values of Record field i converted to its dtype."""
+    if i in categorical_fields:
+        return pandas.Categorical(values)
+    # integers and dates repeat a lot, so convert each distinct value once
+    if i in integer_fields:
+        codes, uniques = pandas.factorize(values)
+        return uniques.astype('int64')[codes]
+    if i in date_fields:
+        codes, uniques = pandas.factorize(values)
+        return pandas.to_datetime(uniques, format='%Y%m%d',
+                                  errors='coerce').values[codes]
+    return values
+
+############################################################
+# Columnar equivalents of the clean.py steps, working on a DataFrame of
+#   extracted rows with columns clean.FIELDS
+#
+def rows_to_frame(rows):
+    """
+    Return pandas.DataFrame of extracted rows, as from extract.iter_data,
+    with EI_ID scrubbed as in clean.Record and a recId column added.
+    """
+    df = pandas.DataFrame.from_records(list(rows), columns=clean.FIELDS)
+    df['EI_ID'] = clean.scrub_sernos(df['EI_ID'])
+    df['recId'] = (df['EVENT_DATE'] + '_' + df['EVENT_NO'] + '_' +
+                   df['EI_ID'] + '_' + df['SYS_CODE'])
+    return df
+
+def drop_duplicate_records(df):
+    """Columnar clean.removeDuplicateRecords; keeps first of each."""
+    return df.drop_duplicates(subset=clean.FIELDS[:9])
+
+def drop_blank_narr_event(df):
+    """Columnar clean.removeBlankNarrEvent."""
+    return df[(df['CORR_DATE_TIME'] != '') & (df['NARR'] != '')]
+
+def drop_duplicate_ids(df, priority='byEventDate'):
+    """
+    Columnar clean.removeDuplicateIds.  Of rows sharing a recId, keep the
+    one with the latest EVENT_DATE and then the longest NARR
+    ('byEventDate'), or the other way around ('byNarr').  Ties go to the
+    first row.
+    """
+    if priority not in ['byNarr', 'byEventDate']:
+        raise RuntimeError("drop_duplicate_ids requires priority argument 'byNarr' or 'byEventDate'")
+    eventDate = df['EVENT_DATE'].astype('int64').values
+    narrLen = df['NARR'].str.len().values.astype('int64')
+    # both keys packed in one: dates are 8 digits, narratives < 10**6 long
+    if priority == 'byEventDate':
+        rank = eventDate * 10**6 + narrLen
+    else:
+        rank = narrLen * 10**8 + eventDate
+    rank = pandas.Series(rank)
+    best = rank.groupby(df['recId'].values, sort=False).transform('max')
+    df = df[(rank == best).values]
+    return df.drop_duplicates(subset=['recId'])
+
+def clean_frame(df, priority='byEventDate'):
+    """
+    Return df with duplicate records, records with blank CORR_DATE_TIME or
+    NARR, and duplicate recIds removed, as by the clean.py steps.
+    """
+    df = drop_duplicate_records(df)
+    df = drop_blank_narr_event(df)
+    return drop_duplicate_ids(df, priority)
+
+def frame_to_df(df, col_names, typed=False):
+    """Return cleaned frame df as toDataFrame would from its Records."""
+    ret = df[['recId'] + clean.FIELDS[:9]]
+    ret.columns = col_names
+    ret.index = df['recId'].values
+    if typed:
+        ret = ret.copy()
+        for i, name in enumerate(col_names[1:]):
+            ret[name] = typedColumn(i, ret[name].values)
+    return ret
+#
+############################################################
 
 def merge_by_id(df1, df2):
     """
@@ -40,7 +152,7 @@ merge_cols = [
 'FAULTDAT',
 'FAULTNO',
 'SS']
-def merge_ascii(df1, df2):
+def merge_ascii(df1, df2, processes=1):
     """Merge records from FAU and ACT files into one dataframe.
     
     This accounts for the discrepancies in CORRDATE and WUC fields by
@@ -49,23 +161,31 @@ def merge_ascii(df1, df2):
     
     @type df1, df2: pandas.DataFrame
     @param df1, df2: fau and act dataframes, respectively
+    @type  processes: int
+    @param processes: number of worker processes to merge in, as
+                      partitioned_merge.  None uses one per cpu.
     @return: pandas.DataFrame of values merged
     
     """
-    draft = pandas.merge(df1, df2, 
-                         how="outer", 
-                         on=merge_cols, 
-                         suffixes=('_fau', '_act'))
-    draft['CORRDATE'] = pandas.Series([min(draft['CORRDATE_fau'][i], 
-                                           draft['CORRDATE_act'][i]) for i 
-                                           in draft.index])
+    draft = partitioned_merge(df1, df2, 
+                              on=merge_cols, 
+                              suffixes=('_fau', '_act'),
+                              processes=processes)
+    draft['CORRDATE'] = earliest(draft['CORRDATE_fau'], draft['CORRDATE_act'])
     draft['WUC'] = draft['WUC_fau']
     draft = draft.drop(['CORRDATE_fau', 'CORRDATE_act',
                         'WUC_fau', 'WUC_act'], axis=1)
     draft['EVENT_DATE'] = draft['FAULTDAT']
-    draft['FAULTNO'] = draft['FAULTNO'].map(int)
+    draft['FAULTNO'] = draft['FAULTNO'].astype(int)
     return draft
 
+def earliest(s1, s2):
+    """
+    Return element-wise minimum of Series s1 and s2, taking the value from
+    the other where one is missing (as after an outer join).
+    """
+    return s1.where(~(s1.isnull() | (s2 < s1)), s2)
+
 def vmep_faultnos_to_ints(num):
     if isinstance(num, str):
         return (int(num) if num.isdigit() else None)
@@ -75,54 +195,452 @@ def vmep_faultnos_to_ints(num):
         return num
     return None
 
-def ascii_to_df():
-    fauRecords = list()
-    actRecords = list()
-    up = extract.extract_data(DEF.__ascii_base__, 'FAU', fauRecords)
-    up += extract.extract_data(DEF.__ascii_base__, 'ACT', actRecords)
-    
-    fauRecords = clean.getRecords(fauRecords)
-    actRecords = clean.getRecords(actRecords)
-    
-    fauRecords = clean.removeDuplicateRecords(fauRecords)
-    actRecords = clean.removeDuplicateRecords(actRecords)
-    
-    fauRecords = clean.removeBlankNarrEvent(fauRecords)
-    actRecords = clean.removeBlankNarrEvent(actRecords)
-    
-    fauRecords = clean.removeDuplicateIds(fauRecords)
-    actRecords = clean.removeDuplicateIds(actRecords)
-    
-    fauDF = toDataFrame(fauRecords, DEF.__ascii_FAU_fields__)
-    actDF = toDataFrame(actRecords, DEF.__ascii_ACT_fields__)
-    
-    return merge_ascii(fauDF, actDF)
-
-def ascii_plus_vmep():
-    return pandas.concat(
-        [vmep_to_df(), ascii_to_df()]
-        )#.sort(['EI_ID', 'EVENT_DATE', 'FAULTNO'],
-                #inplace=True, 
-          #      ascending=[1,0,0])
-
-def vmep_to_df():
-    xl = pandas.ExcelFile(DEF.__latest_vmep__)
-    vmep = xl.parse(DEF.__vmep_sheet_name__, index_col=None, na_values='')
+def ascii_to_df(processes=1, manifest=None, columnar=False, typed=False,
+                snapshots=None, spill=None, metrics=None, prefetch=0):
+    """
+    Extract, clean and merge FAU and ACT data from DEF.__ascii_base__.
+
+    DEF.__ascii_base__ is walked once for both FAU and ACT files, and
+    records are streamed from extraction through the cleaning steps, so
+    raw extracted rows are never held all at once.
+
+    @type  processes: int
+    @param processes: number of worker processes for extraction, as in
+                      extract.extract_data, and for merging, as in
+                      merge_ascii
+    @type  manifest: str
+    @param manifest: if given, file in which extracted results are cached
+                     per report file, so that only new or changed files are
+                     parsed.  See manifest.Manifest.
+    @type  columnar: bool
+    @param columnar: clean the extracted rows as DataFrames (clean_frame)
+                     rather than as Records.  Faster, but all rows are held
+                     at once.
+    @type  typed: bool
+    @param typed: build the FAU and ACT frames with typed columns, as
+                  toDataFrame
+    @type  snapshots: str or snapshot.Store
+    @param snapshots: if given, directory in which the cleaned FAU and ACT
+                      frames ('fau', 'act') and the merged frame ('ascii')
+                      are snapshotted, and with columnar the extracted
+                      frames too ('fau_extracted', 'act_extracted')
+    @type  spill: str or bool
+    @param spill: if given, remove duplicates out of core (see external),
+                  spilling sorted runs of Records to this directory, or to
+                  the system temporary directory if True.  For corpora
+                  whose Records do not fit in memory.
+    @type  metrics: metrics.Metrics, callable or str
+    @param metrics: if given, where the time taken and records kept and
+                    dropped by each stage go: a Metrics, or a sink for one
+                    (see metrics.metricsSink), which is closed on return
+    @type  prefetch: int
+    @param prefetch: number of report files read ahead of parsing, as in
+                     extract.extract_data
+    @return: pandas.DataFrame
+    """
+    if manifest is not None:
+        manifest = Manifest(manifest)
+    if isinstance(snapshots, basestring):
+        snapshots = Store(snapshots)
+    m = metrics
+    if m is None:
+        m = NO_METRICS
+    elif not isinstance(m, Metrics):
+        m = Metrics(m)
+    try:
+        up = extract.Rejects()  # bounded, unlike a list of weirdos
+        # one walk of the tree for both flags; the rows of each are still
+        #   streamed, file by file
+        paths = extract.datafiles_by_flag(DEF.__ascii_base__)
+        rows = extract.iter_paths(paths['FAU'], up, processes, manifest,
+                                  prefetch)
+        fauDF = _ascii_frame('fau', rows, DEF.__ascii_FAU_fields__, columnar,
+                             typed, spill, snapshots, m)
+        rows = extract.iter_paths(paths['ACT'], up, processes, manifest,
+                                  prefetch)
+        actDF = _ascii_frame('act', rows, DEF.__ascii_ACT_fields__, columnar,
+                             typed, spill, snapshots, m)
+        for reason, n in up.reasons.items():
+            m.drop('weirdos: ' + reason, n)
+        if manifest is not None:
+            manifest.save()
+
+        with m.stage('merge_ascii', len(fauDF) + len(actDF)) as s:
+            df = merge_ascii(fauDF, actDF, processes)
+            s.records_out = len(df)
+        if snapshots is None:
+            return df
+        snapshots.save('fau', fauDF)
+        snapshots.save('act', actDF)
+        return snapshots.save('ascii', df)
+    finally:
+        if m is not metrics:
+            m.close()
+
+def _ascii_frame(name, rows, fields, columnar, typed, spill, snapshots, m):
+    """
+    Return DataFrame of the cleaned records of extracted rows, for
+    ascii_to_df, timing each step in Metrics m as a stage named for it
+    after name ('fau' or 'act').
+    """
+    rows = m.iterate(name + '.extract', rows)
+    if columnar:
+        with m.stage(name + '.rows_to_frame', upstream=name + '.extract') as s:
+            df = rows_to_frame(rows)
+            s.records_out = len(df)
+        if snapshots is not None:
+            snapshots.save(name + '_extracted', df)
+        # the steps of clean_frame, each counted under its own rule
+        for step, stage, rule in [
+                (drop_duplicate_records, 'duplicates', 'duplicates'),
+                (drop_blank_narr_event, 'blank', 'blank_narr_event'),
+                (drop_duplicate_ids, 'duplicate_ids', 'duplicate_ids')]:
+            with m.stage('%s.%s' % (name, stage), len(df), rule=rule) as s:
+                df = step(df)
+                s.records_out = len(df)
+        with m.stage(name + '.frame_to_df', len(df)) as s:
+            df = frame_to_df(df, fields, typed)
+            s.records_out = len(df)
+        return df
+
+    records = m.iterate(name + '.records', clean.iterRecords(rows),
+                        name + '.extract')
+    if spill:
+        # one sort, by recordId and best first; each step after it only
+        #   looks at one recordId's Records at a time
+        tmpdir = None if spill is True else spill
+        records = m.iterate(name + '.sort_by_id',
+                            external.iterSortedById(records, tmpdir=tmpdir),
+                            name + '.records')
+        records = m.iterate(name + '.duplicates',
+                            external.iterDistinctById(records),
+                            name + '.sort_by_id', 'duplicates')
+        records = m.iterate(name + '.blank',
+                            clean.iterNonBlankNarrEvent(records),
+                            name + '.duplicates', 'blank_narr_event')
+        records = m.iterate(name + '.duplicate_ids',
+                            external.iterFirstById(records),
+                            name + '.blank', 'duplicate_ids')
+        last = name + '.duplicate_ids'
+    else:
+        records = m.iterate(name + '.duplicates',
+                            clean.iterDistinctRecords(records),
+                            name + '.records', 'duplicates')
+        records = m.iterate(name + '.blank',
+                            clean.iterNonBlankNarrEvent(records),
+                            name + '.duplicates', 'blank_narr_event')
+        with m.stage(name + '.duplicate_ids', upstream=name + '.blank',
+                     rule='duplicate_ids') as s:
+            records = clean.removeDuplicateIds(records)
+            s.records_out = len(records)
+        last = name + '.duplicate_ids'
+    with m.stage(name + '.toDataFrame', upstream=last) as s:
+        df = toDataFrame(records, fields, typed)
+        s.records_out = len(df)
+    return df
+
+def ascii_plus_vmep(snapshots=None, sort=False):
+    """
+    Return VMEP and ASCII data concatenated.
+
+    @type  snapshots: str or snapshot.Store
+    @param snapshots: if given, directory of snapshots from which the
+                      'ascii' and 'vmep' frames are taken when present, and
+                      to which they are saved when not
+    @type  sort: bool
+    @param sort: put the rows in sort_by_id order: by EI_ID, latest
+                 EVENT_DATE and FAULTNO first
+    @return: pandas.DataFrame
+    """
+    if snapshots is None:
+        df = pandas.concat([vmep_to_df(), ascii_to_df()])
+    else:
+        if isinstance(snapshots, basestring):
+            snapshots = Store(snapshots)
+        if snapshots.has('ascii'):
+            asciiDF = snapshots.load('ascii')
+        else:  # ascii_to_df snapshots it, so not Store.cached
+            asciiDF = ascii_to_df(snapshots=snapshots)
+        df = pandas.concat([vmep_to_df(snapshots), asciiDF])
+    return sort_by_id(df) if sort else df
+
+def vmep_to_df(snapshots=None, usecols=None, cache=True):
+    """
+    Return VMEP data from DEF.__latest_vmep__, or from the 'vmep' snapshot
+    in directory snapshots if given and present.
+
+    @type  usecols: list
+    @param usecols: if given, names of the only columns of the workbook to
+                    read.  UNIT_ID is always read, to give EI_ID.
+    @type  cache: bool
+    @param cache: read the workbook through its sidecar, as read_workbook
+    """
+    if snapshots is not None:
+        if isinstance(snapshots, basestring):
+            snapshots = Store(snapshots)
+        return snapshots.cached('vmep', vmep_to_df, usecols=usecols,
+                                cache=cache)
+    if usecols is not None and 'UNIT_ID' not in usecols:
+        usecols = list(usecols) + ['UNIT_ID']
+    vmep = read_workbook(DEF.__latest_vmep__, DEF.__vmep_sheet_name__,
+                         usecols, cache)
 #    vmep['FAULTNO'] = vmep['FAULTNO'].map(vmep_faultnos_to_ints)
-    vmep['EI_ID'] = vmep['UNIT_ID'].map(clean.uid_to_eid)
+    vmep['EI_ID'] = clean.uid_to_eids(vmep['UNIT_ID'])
     vmep = vmep.drop('UNIT_ID', axis=1)
     return vmep
 
-def dash13_to_df():
-    xl = pandas.ExcelFile(DEF.__dash13_filename__)
-    d13 = xl.parse(DEF.__dash13_sheet_name__, index_col=None, na_values='')
+def dash13_to_df(usecols=None, cache=True):
+    """
+    Return DASH13 data from DEF.__dash13_filename__.  usecols and cache are
+    as for vmep_to_df.
+    """
+    if usecols is not None and 'UNIT_ID' not in usecols:
+        usecols = list(usecols) + ['UNIT_ID']
+    d13 = read_workbook(DEF.__dash13_filename__, DEF.__dash13_sheet_name__,
+                        usecols, cache)
     d13['EI_ID'] = d13['UNIT_ID']
     d13 = d13.drop('UNIT_ID', axis=1)
     return d13
 
+############################################################
+# Excel workbooks are slow to parse, so each sheet read is kept in a
+#   snapshot file (the sidecar) and later reads load that instead.  The
+#   workbook's exact size and mtime are in the sidecar's name, so a
+#   changed workbook is read afresh, however soon after the last read,
+#   and the sidecar of what it held before is removed.
+#
+def read_workbook(path, sheet, usecols=None, cache=True, cachedir=None):
+    """
+    Return pandas.DataFrame of sheet of Excel workbook at path, parsed as
+    vmep_to_df always has (no index column; empty cells missing).
+
+    @type  usecols: list
+    @param usecols: if given, names of the only columns to return.  A
+                    sidecar holds every column, so serves any usecols.
+    @type  cache: bool
+    @param cache: read from, or else write, the sheet's sidecar.  If the
+                  sidecar cannot be written the workbook is just parsed.
+    @type  cachedir: str
+    @param cachedir: directory of sidecars; by default the workbook's own
+    """
+    if not cache:
+        return pandas.ExcelFile(path).parse(sheet, index_col=None,
+                                            na_values='', usecols=usecols)
+    sidecar = sidecar_path(path, sheet, cachedir)
+    if os.path.exists(sidecar):
+        return snapshot.load(sidecar, usecols)
+    df = pandas.ExcelFile(path).parse(sheet, index_col=None, na_values='')
+    try:
+        for stale in _sidecars(path, sheet, cachedir):
+            os.remove(stale)
+        snapshot.save(df, sidecar)
+    except (IOError, OSError):
+        pass
+    return df if usecols is None else df[list(usecols)]
+
+def sidecar_path(path, sheet, cachedir=None):
+    """
+    Return path of the sidecar of sheet of Excel workbook at path, as the
+    workbook is now: its size and mtime, to the microsecond, are in the
+    name.
+    """
+    directory, prefix = _sidecar_prefix(path, cachedir)
+    st = os.stat(path)
+    return os.path.join(directory, prefix + '%d-%d.%s.arrow' % (
+        st.st_size, int(st.st_mtime * 1e6), sheet))
+
+def _sidecar_prefix(path, cachedir):
+    """Return (directory, name prefix) of the sidecars of workbook at path."""
+    path = os.path.abspath(path)
+    directory, name = os.path.split(path)
+    # the workbook's full path is hashed in, as cachedir may be shared
+    tag = hashlib.sha1(path.encode('utf-8') if isinstance(path, unicode)
+                       else path).hexdigest()[:8]
+    return cachedir or directory, '.%s.%s.' % (name, tag)
+
+def _sidecars(path, sheet, cachedir):
+    """
+    Return paths of the sidecars of sheet of workbook at path, for any
+    size and mtime.
+    """
+    directory, prefix = _sidecar_prefix(path, cachedir)
+    pattern = re.compile(re.escape(prefix) + r'\d+-\d+\.' +
+                         re.escape(sheet) + r'\.arrow$')
+    return [os.path.join(directory, f) for f in os.listdir(directory)
+            if pattern.match(f)]
+#
+############################################################
+
 id_cols = ['FAULTDAT', 'FAULTNO', 'EI_ID']    
-def merge_ascii_vmep(asciiDF, vmepDF):    
-    return pandas.merge(asciiDF, vmepDF, 
-                        on=id_cols,
-                        how='outer', 
-                        suffixes=('_ascii', '_vmep'))
+def merge_ascii_vmep(asciiDF, vmepDF, processes=1):    
+    return partitioned_merge(asciiDF, vmepDF, 
+                             on=id_cols,
+                             suffixes=('_ascii', '_vmep'),
+                             processes=processes)
+
+############################################################
+# Merging in parallel.  Rows are bucketed by a hash of EI_ID, which is
+#   one of the join keys of every merge here, so rows that join always
+#   land in the same bucket and the buckets can be merged independently.
+#
+def partitioned_merge(left, right, on, suffixes=('_x', '_y'),
+                      processes=1, partitions=None, how='outer'):
+    """
+    Return pandas.merge(left, right, how, on=on, suffixes=suffixes), with
+    the same rows but not in the same order, merged in buckets by EI_ID
+    across a pool of processes.  The result has a fresh RangeIndex.
+
+    @type  processes: int
+    @param processes: number of worker processes.  None uses one per cpu;
+                      1 (default) merges whole in this process.
+    @type  partitions: int
+    @param partitions: number of buckets; by default as many as processes
+    """
+    if processes is None:
+        processes = multiprocessing.cpu_count()
+    if processes == 1 and not partitions:
+        return pandas.merge(left, right, how=how, on=on, suffixes=suffixes)
+    if 'EI_ID' not in on:
+        raise ValueError("partitioned_merge needs EI_ID among the join keys")
+    n = partitions or processes
+    kwargs = {'how': how, 'on': on, 'suffixes': suffixes}
+    parts = [(l, r, kwargs) for l, r in zip(partition(left, n),
+                                           partition(right, n))]
+    if processes == 1:
+        merged = map(_merge_part, parts)
+    else:
+        # workers forked after _parts is set inherit the buckets, so need
+        # only be told their indices.  Merged buckets come back through
+        # snapshot.dumps, much quicker than pickling frames of strings
+        global _parts
+        _parts = parts
+        pool = multiprocessing.Pool(processes)
+        try:
+            merged = pool.map(_merge_inherited if _FORKS else _merge_sent,
+                              range(n) if _FORKS else parts)
+        finally:
+            pool.close()
+            pool.join()
+            _parts = None
+        merged = [snapshot.loads(m) for m in merged]
+    return pandas.concat(merged, ignore_index=True)
+
+def partition(df, n):
+    """
+    Return list of n frames holding the rows of df, bucketed by a hash of
+    EI_ID that is the same for equal values in any frame.
+    """
+    buckets = (pandas.util.hash_pandas_object(df['EI_ID'], index=False)
+               .values % n)
+    return [df[buckets == i] for i in range(n)]
+
+_FORKS = sys.platform != 'win32'  # whether pool workers are forked
+_parts = None  # buckets to be merged by forked workers
+
+def _merge_part(args):
+    left, right, kwargs = args
+    return pandas.merge(left, right, **kwargs)
+
+def _merge_inherited(i):
+    return snapshot.dumps(_merge_part(_parts[i]))
+
+def _merge_sent(args):
+    return snapshot.dumps(_merge_part(args))
+#
+############################################################
+
+############################################################
+# Sorting by airframe, latest fault first: EI_ID ascending, then
+#   EVENT_DATE and FAULTNO descending, the order clean.sortById
+#   gives Records.  Each column is ranked once, and the ranks are
+#   packed into one int64 key, so rows are sorted on integers
+#   rather than on strings or tuples.
+#
+SORT_COLUMNS = ['EI_ID', 'EVENT_DATE', 'FAULTNO']
+SORT_ASCENDING = [True, False, False]
+
+def id_sort_key(df):
+    """
+    Return int64 array ranking the rows of df in sort_by_id order, equal
+    for rows with equal EI_ID, EVENT_DATE and FAULTNO.  Missing values rank
+    last in each column, as in DataFrame.sort_values.
+    """
+    ranks, sizes = list(), list()
+    for col, ascending in zip(SORT_COLUMNS, SORT_ASCENDING):
+        codes, uniques = pandas.factorize(df[col], sort=True)
+        n = len(uniques)
+        codes = codes.astype('i8')
+        if not ascending:
+            codes = numpy.where(codes >= 0, n - 1 - codes, codes)
+        codes[codes < 0] = n
+        ranks.append(codes)
+        sizes.append(n + 1)
+    if sizes[0] * sizes[1] * sizes[2] < 2**63:
+        return (ranks[0] * sizes[1] + ranks[1]) * sizes[2] + ranks[2]
+    # too many distinct values to pack: rank the rows by sorting them
+    order = numpy.lexsort(ranks[::-1])
+    ranked = numpy.column_stack(ranks)[order]
+    new = numpy.ones(len(order), dtype=bool)
+    new[1:] = (ranked[1:] != ranked[:-1]).any(axis=1)
+    key = numpy.empty(len(order), dtype='i8')
+    key[order] = numpy.cumsum(new) - 1
+    return key
+
+def sort_by_id(df):
+    """
+    Return df sorted by EI_ID, then latest EVENT_DATE and FAULTNO first,
+    as df.sort_values(SORT_COLUMNS, ascending=SORT_ASCENDING, kind=
+    'mergesort'): rows with equal keys keep their order, and keep their
+    index labels.
+    """
+    return df.take(numpy.argsort(id_sort_key(df), kind='mergesort'))
+
+def merge_sorted(frames):
+    """
+    Return frames, each already in sort_by_id order (the outputs for
+    separate files, say), merged in sort_by_id order, without sorting them
+    again.  As sort_by_id of the frames concatenated in order: rows with
+    equal keys come out in the order of their frames.
+
+    The keys are worked out once, by id_sort_key over all the frames, so
+    that keys of different frames compare, and each frame's keys are then
+    a sorted run.  The runs are merged in pairs, neighbours with
+    neighbours, each pair by searching the second run's keys in the first.
+
+    @raise ValueError: if a frame is not in sort_by_id order
+    """
+    frames = list(frames)
+    df = pandas.concat(frames)
+    key = id_sort_key(df)
+    runs, start = list(), 0
+    for f in frames:
+        run = key[start:start + len(f)]
+        if (run[1:] < run[:-1]).any():
+            raise ValueError("merge_sorted needs frames in sort_by_id order")
+        runs.append((run, numpy.arange(start, start + len(f))))
+        start += len(f)
+    if not runs:
+        return df
+    while len(runs) > 1:
+        runs = [_merge_runs(runs[i], runs[i + 1]) if i + 1 < len(runs) else
+                runs[i] for i in range(0, len(runs), 2)]
+    return df.take(runs[0][1])
+
+def _merge_runs(first, second):
+    """
+    Return (keys, rows) of sorted runs first and second, each (keys, rows),
+    merged, rows of first before rows of second with equal keys.
+    """
+    (k1, r1), (k2, r2) = first, second
+    # where each of second goes: after the first's keys not above it, and
+    #   after those of second before it
+    at = numpy.searchsorted(k1, k2, side='right') + numpy.arange(len(k2))
+    keys = numpy.empty(len(k1) + len(k2), dtype=k1.dtype)
+    rows = numpy.empty(len(keys), dtype=r1.dtype)
+    fromFirst = numpy.ones(len(keys), dtype=bool)
+    fromFirst[at] = False
+    keys[at], rows[at] = k2, r2
+    keys[fromFirst], rows[fromFirst] = k1, r1
+    return keys, rows
+#
+############################################################
@@ -0,0 +1,206 @@
+"""
+Out-of-core versions of the Record cleaning steps in clean, for corpora too
+big to hold in memory.
+
+Records are spilled to disk in sorted runs of at most runsize, which are
+then merged, so that records to be compared arrive together and only one
+run's worth is ever held.  Runs are closed once written, and merged at most
+MERGEWIDTH at a time, each group into a longer run, until few enough are
+left to merge in one pass, so that no more than MERGEWIDTH files are ever
+open at once, however many runs there are.  Records are spilled as their
+values and come back through Record.__setstate__, without being scrubbed
+again.  Survivors come out in key order (content, or recordId) rather than
+in the order they went in.
+"""
+
+import os
+import heapq
+import marshal
+import struct
+import tempfile
+
+from . import clean
+
+RUNSIZE = 200000  # records per sorted run
+BLOCKSIZE = 1000  # items written together in a run file
+MERGEWIDTH = 64   # runs merged, so files open, at once
+
+def sortedRuns(items, runsize=RUNSIZE, tmpdir=None):
+    """
+    Spill items, which must be orderable and marshallable (tuples of
+    strs and numbers, say), to files in tmpdir (the system
+    temporary directory by default) in sorted runs of at most runsize, and
+    return list of the paths of the files, which are closed.  Each file is
+    deleted once read back by _readRun.
+    """
+    runs = list()
+    buf = list()
+    try:
+        for item in items:
+            buf.append(item)
+            if len(buf) >= runsize:
+                buf.sort()
+                runs.append(_writeRun(buf, tmpdir))
+                buf = list()
+        if buf:
+            buf.sort()
+            runs.append(_writeRun(buf, tmpdir))
+    except:
+        _removeRuns(runs)
+        raise
+    return runs
+
+def _writeRun(items, tmpdir):
+    """Write items, in order, to a new file in tmpdir; return its path."""
+    fd, path = tempfile.mkstemp(suffix='.run', dir=tmpdir)
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            block = list()
+            for item in items:
+                block.append(item)
+                if len(block) >= BLOCKSIZE:
+                    _writeBlock(f, block)
+                    block = list()
+            if block:
+                _writeBlock(f, block)
+    except:
+        os.remove(path)
+        raise
+    return path
+
+def _writeBlock(f, block):
+    # marshal to and from strs, as it works a byte at a time on files
+    block = marshal.dumps(block)
+    f.write(struct.pack('<I', len(block)))
+    f.write(block)
+
+def _readRun(path):
+    """Yield the items of run file at path, removing it when done."""
+    try:
+        with open(path, 'rb') as f:
+            size = f.read(4)
+            while size:
+                for item in marshal.loads(
+                    f.read(struct.unpack('<I', size)[0])):
+                    yield item
+                size = f.read(4)
+    finally:
+        os.remove(path)
+
+def _removeRuns(runs):
+    for path in runs:
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+def _record(values, serno):
+    r = clean.Record.__new__(clean.Record)
+    r.__setstate__((values, serno))
+    return r
+
+def externalSort(items, runsize=RUNSIZE, tmpdir=None,
+                 mergewidth=MERGEWIDTH):
+    """
+    Yield items in sorted order, holding at most runsize in memory and
+    having at most mergewidth run files open at once.
+    """
+    runs = sortedRuns(items, runsize, tmpdir)
+    readers = list()
+    try:
+        # merge the oldest runs first, so each item is rewritten about
+        #   log(runs, mergewidth) times
+        while len(runs) > mergewidth:
+            readers = [_readRun(path) for path in runs[:mergewidth]]
+            path = _writeRun(heapq.merge(*readers), tmpdir)
+            runs = runs[mergewidth:] + [path]
+        readers = [_readRun(path) for path in runs]
+        for item in heapq.merge(*readers):
+            yield item
+    finally:
+        for r in readers:
+            r.close()
+        _removeRuns(runs)
+
+def iterDistinctRecords(rl, runsize=RUNSIZE, tmpdir=None):
+    """
+    Out-of-core clean.iterDistinctRecords: pass on the first seen of each
+    set of equal Records of rl, in order of their values.
+    """
+    keyed = ((r.wholerec, seq, r.values[-2:], r._serno)
+             for seq, r in enumerate(rl))
+    last = None
+    for wholerec, seq, rest, serno in externalSort(keyed, runsize, tmpdir):
+        if wholerec != last:
+            last = wholerec
+            yield _record(wholerec + rest, serno)
+
+def iterBestById(rl, priority='byEventDate', runsize=RUNSIZE, tmpdir=None,
+                 audit=None):
+    """
+    Out-of-core clean.removeDuplicateIds: pass on the best Record of rl for
+    each recordId under <priority>, the first seen of equals, in order of
+    recordId.  Equal Records need not be removed first, as the first of
+    them is the one kept.
+
+    @type  audit: str or callable
+    @param audit: as for clean.removeDuplicateIds, told of each Record
+                  discarded that ties with the one selected on the first
+                  criterion of <priority>.  The Records of a recordId come
+                  out of the sort best first, so each is told as soon as
+                  it is read back, with nothing held.
+    """
+    if priority not in ['byNarr', 'byEventDate']:
+        raise RuntimeError("iterBestById requires priority argument 'byNarr' or 'byEventDate'")
+    return iterFirstById(iterSortedById(rl, priority, runsize, tmpdir),
+                         priority, audit)
+
+def iterSortedById(rl, priority='byEventDate', runsize=RUNSIZE, tmpdir=None):
+    """
+    Pass on the Records of rl in order of recordId, each recordId's best
+    under <priority> first, and the first seen first of Records ranked
+    equal.  The stream iterDistinctById and iterFirstById take.
+    """
+    # ranks are negated so that the best of each recordId sorts first
+    keyed = ((r.recId, tuple(-k for k in clean.recordRank(r, priority)),
+              seq, r.values, r._serno) for seq, r in enumerate(rl))
+    for recId, rank, seq, values, serno in externalSort(keyed, runsize,
+                                                        tmpdir):
+        yield _record(values, serno)
+
+def iterDistinctById(rl):
+    """
+    clean.iterDistinctRecords for Records grouped by recordId, as from
+    iterSortedById: pass on the first of each set of equal Records,
+    holding only those of one recordId.  Equal Records share a recordId,
+    so none is missed.
+    """
+    recId, seen = None, set()
+    for r in rl:
+        if r.recId != recId:
+            recId, seen = r.recId, set()
+        if r not in seen:
+            seen.add(r)
+            yield r
+
+def iterFirstById(rl, priority='byEventDate', audit=None):
+    """
+    clean.removeDuplicateIds for Records as from iterSortedById: pass on
+    the first Record of each recordId, which is its best under <priority>.
+    audit as for iterBestById.
+    """
+    sink, close = clean.auditSink(audit, priority)
+    try:
+        selected = None
+        for r in rl:
+            if selected is None or r.recId != selected.recId:
+                selected = r
+                if sink is not None:
+                    rank = clean.recordRank(r, priority)
+                yield r
+            elif (sink is not None and
+                  clean.recordRank(r, priority)[0] == rank[0]):
+                sink(selected, r)
+    finally:
+        if close is not None:
+            close()
@@ -2,7 +2,12 @@
 Routines for extracting data from unworked ASCII data files
 """
 
-import re, os
+import re, os, sys
+import mmap
+import random
+import threading
+import multiprocessing
+from cStringIO import StringIO
 from . import defaults as DEF
 
 ##########################################################
@@ -26,6 +31,23 @@ STARLINE = re.compile('^\*{50,}')
 PAGENUMLINE = re.compile('^[0-9]+$')
 PAGENUMRANGE = 1000  # assume a lone number <= 1000 is a page number
 
+HEADERLINES = [STATUSLINE, REDXLINE, CIRCLELINE, STFAULTLINE, FIELDLINE,
+               AWAAMLINE, TOTRECORDSLINE, TOTPAGESLINE, TOTFIELDSLINE,
+               ELAPSEDTIMELINE, SUMMARYLINE, DASHLINE, STARLINE]
+
+# kinds of line, as returned by classify
+BLANK, DATE, HEADER, CLOSED, PAGENO, DATA = range(6)
+
+# all of the above in one pattern, so a line is matched only once.  CLOSED
+#   is the regex equivalent of simplify(s) == 'CLOSED'
+LINEKIND = re.compile('|'.join(
+    ['(?P<date>%s)' % DATELINE.pattern.lstrip('^').replace('(', '(?:')] +
+    ['(?P<header>%s)' % '|'.join('(?:%s)' % p.pattern.lstrip('^') for
+                                 p in HEADERLINES)] +
+    ['(?P<closed>\s*C[C\s]*L[L\s]*O[O\s]*S[S\s]*E[E\s]*D[D\s]*$)'] +
+    ['(?P<pageno>%s)' % PAGENUMLINE.pattern.lstrip('^')]))
+_kinds = {'date': DATE, 'header': HEADER, 'closed': CLOSED, 'pageno': PAGENO}
+
 def simplify(s):
     """Routine to identify those bothersome ascii art 'closed' lines"""
     ret = ''
@@ -42,27 +64,22 @@ def likelyPageNo(s):
         return True
     return False
     
+def classify(s):
+    """
+    Return the kind of line s is: BLANK, DATE, HEADER, CLOSED (ascii art),
+    PAGENO or DATA.  Only DATA lines are worth trying to process.
+    """
+    if not s: return BLANK
+    m = LINEKIND.match(s)
+    if m is None: return DATA
+    kind = _kinds[m.lastgroup]
+    if kind == PAGENO and int(s) > PAGENUMRANGE:
+        return DATA
+    return kind
+
 def interesting(s):
     """Determine if a line is worth trying to process."""
-    if not s: return False
-    elif DATELINE.match(s): return False
-    elif STATUSLINE.match(s): return False
-    elif REDXLINE.match(s): return False
-    elif CIRCLELINE.match(s): return False
-    elif STFAULTLINE.match(s): return False
-    elif FIELDLINE.match(s): return False
-    elif AWAAMLINE.match(s): return False
-    elif TOTRECORDSLINE.match(s): return False
-    elif TOTPAGESLINE.match(s): return False
-    elif TOTFIELDSLINE.match(s): return False
-    elif ELAPSEDTIMELINE.match(s): return False
-    elif SUMMARYLINE.match(s): return False
-    elif DASHLINE.match(s): return False
-    elif STARLINE.match(s): return False
-    elif simplify(s) == 'CLOSED': return False
-    elif likelyPageNo(s):
-        return False
-    return True
+    return classify(s) == DATA
 
 #
 ############################################################
@@ -110,27 +127,28 @@ def noNarrField(l):
 
 def check(entry):
     # some basic checks for line integrity
+    return checkReason(entry) is None
+
+def checkReason(entry):
+    """
+    Return the first check that entry fails: 'field count', 'corr date',
+    'sys code', 'model', 'fault date' or 'status', or None if it passes.
+    """
     if not hasRightNumberFields(entry):
-        #print entry
-        return False
+        return 'field count'
     if (corrDateField(entry) and
         not looksLikeDate(corrDateField(entry))):
-        #print entry
-        return False
+        return 'corr date'
     if not looksLikeSysCode(sysCodeField(entry)):
-        #print entry
-        return False
+        return 'sys code'
     if not looksLikeModel(modelField(entry)):
-        #print entry
-        return False
+        return 'model'
     if not looksLikeDate(faultDateField(entry)):
-        #print entry
-        return False
+        return 'fault date'
     if (statusField(entry) and
         not looksLikeStatus(statusField(entry))):
-        #print entry
-        return False
-    return True
+        return 'status'
+    return None
 
 def hasRightNumberFields(entry):
     return len(entry) == 9
@@ -156,8 +174,27 @@ def fauact_filter(filenames, flag):
     if flag == 'ACT':
         return [f for f in filenames if flag in f]
     return [f for f in filenames if flag in f and not 'ACT' in f]
+
+def datafiles(startpath, FLAG):
+    """Yield, in os.walk order, paths of files under startpath matching FLAG."""
+    for root, dirs, files in os.walk(startpath):
+        for f in fauact_filter(files, FLAG):
+            yield os.path.join(root, f)
+
+def datafiles_by_flag(startpath, flags=('FAU', 'ACT')):
+    """
+    Return dict of flag : list of paths of files under startpath matching
+    flag, in os.walk order, as datafiles gives them, from a single walk.
+    """
+    ret = dict((flag, list()) for flag in flags)
+    for root, dirs, files in os.walk(startpath):
+        for flag in flags:
+            ret[flag] += [os.path.join(root, f) for f in
+                          fauact_filter(files, flag)]
+    return ret
     
-def extract_data(startpath, FLAG, out):
+def extract_data(startpath, FLAG, out, processes=1, manifest=None,
+                 prefetch=0):
     """
     Walk through subdirectory at startpath looking for files with (possible)
     data lines.  With 'out' as filename, write extracted data to out as csv,
@@ -173,6 +210,19 @@ def extract_data(startpath, FLAG, out):
     @param out: as string, filename of csv file to which extracted data should
                 be written.  As list, list to which extracted data, as a list
                 of values, should be appended
+    @type  processes: int
+    @param processes: number of worker processes among which files are
+                      spread.  1 (default) parses in this process; None
+                      uses one worker per cpu.
+    @type  manifest: manifest.Manifest
+    @param manifest: if given, cache of results per file.  Only files new
+                     or changed since they were cached are parsed.
+    @type  prefetch: int
+    @param prefetch: if given, number of files read into memory ahead of
+                     the one being parsed, by background threads, so that
+                     reading (from a network share, say) overlaps parsing.
+                     Only when files are parsed in this process, without a
+                     manifest.
     @rtype:   list
     @return:  list of data strings found to be interesting but which could not
               be processed by extract_data
@@ -183,47 +233,9 @@ def extract_data(startpath, FLAG, out):
     except TypeError:
         dataout = out
 
-    for root, dirs, files in os.walk(startpath):
-        for f in fauact_filter(files, FLAG):
-            with open(os.path.join(root, f), 'r') as read:
-                # contortions here with alternating lines are to handle narrative
-                # entries in FAU files that are broken into two lines.  Some
-                # of these breaks happen around page breaks in the files
-                buf = read.readline().strip()
-                nextline = read.readline()
-                lineno = 1  # line number in buffer
-                while nextline:
-                    if interesting(buf):
-                        if interesting(nextline.strip()):
-                            # handle case where narr split b/w lines
-                            buf += nextline.strip()
-                            nextline = read.readline()
-                            lineno += 1
-                        elif likelyPageNo(nextline.strip()):
-                            # handle case where narr split b/w pages
-                            while (nextline and 
-                                   not interesting(nextline.strip())):
-                                nextline = read.readline()
-                                lineno += 1
-                            if nextline and len(nextline.split()) <= 4:  # number found by experimentation
-                                buf += nextline.strip()
-                                nextline = read.readline()
-                                lineno += 1
-                        # write out what's in buf
-                        w = handleline(buf, dataout, 
-                                       os.path.join(root, f), lineno)
-                        if w is not None:
-                            weirdos.append((w, os.path.join(root, f), lineno))
-                    # check before assigning EOF to buf
-                    if nextline:
-                        buf = nextline.strip()
-                        lineno += 1
-                        nextline = read.readline()
-                # don't forget last line in buffer...
-                if interesting(buf):
-                    w = handleline(buf, dataout, os.path.join(root, f), lineno)
-                    if w is not None:
-                        weirdos.append((w, os.path.join(root, f), lineno))
+    for row in iter_data(startpath, FLAG, weirdos, processes, manifest,
+                         prefetch):
+        writeRow(row, dataout)
 
     try:
         dataout.close()
@@ -232,72 +244,508 @@ def extract_data(startpath, FLAG, out):
 
     return weirdos
 
+def iter_data(startpath, FLAG, weirdos=None, processes=1, manifest=None,
+              prefetch=0):
+    """
+    Generator version of extract_data: yield extracted data, as lists of
+    values, one at a time rather than collecting them.
+
+    @type  weirdos: list or Rejects
+    @param weirdos: if given, list to which (line, path, lineno) is appended
+                    for each line found to be interesting but which could
+                    not be processed, or Rejects in which they are counted
+                    and sampled
+    @rtype:   generator
+    @return:  lists of values, in the same order extract_data writes them
+    """
+    return iter_paths(datafiles(startpath, FLAG), weirdos, processes,
+                      manifest, prefetch)
+
+def iter_paths(paths, weirdos=None, processes=1, manifest=None, prefetch=0):
+    """
+    Yield extracted data from the files at paths, in order, as iter_data
+    does from the files it finds.  For files found in a walk already, as by
+    datafiles_by_flag.
+    """
+    if processes == 1 and manifest is None:
+        if prefetch:
+            for path, data in prefetched(paths, prefetch):
+                for row in iter_lines(StringIO(data), path, weirdos):
+                    yield row
+            return
+        for path in paths:
+            for row in iter_file(path, weirdos):
+                yield row
+    else:
+        for path, rows, w in _extract_files(paths, processes, manifest):
+            if weirdos is not None:
+                weirdos += w
+            for row in rows:
+                yield row
+
+def extract_file(path, out):
+    """
+    Extract data lines from the single file at path to out, as in
+    extract_data.
+
+    @rtype:   list
+    @return:  list of (line, path, lineno) for lines found to be interesting
+              but which could not be processed
+    """
+    weirdos = list()
+    for row in iter_file(path, weirdos):
+        writeRow(row, out)
+    return weirdos
+
+def iter_file(path, weirdos=None):
+    """Yield extracted data from the single file at path, as in iter_data."""
+    with open(path, 'rb') as f:
+        # reading lines from a memory map is much quicker than from the
+        # file.  Lines keep any '\r' before their '\n', but all lines are
+        # stripped anyway.  An empty file cannot be mapped
+        try:
+            read = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:
+            read = f
+        try:
+            for row in iter_lines(read, path, weirdos):
+                yield row
+        finally:
+            if read is not f:
+                read.close()
+
+def iter_lines(read, path, weirdos=None):
+    """
+    Yield extracted data from read, an open file, memory map or StringIO
+    of the contents of the file at path, as in iter_data.
+    """
+    branches = weirdos.branches if isinstance(weirdos, Rejects) else None
+    for buf, lineno in logicalLines(read):
+        l, line, reason = parseReason(buf, branches)
+        if l is None:
+            if branches is not None:
+                weirdos.add(reason, line, path, lineno)
+            elif weirdos is not None:
+                weirdos.append((line, path, lineno))
+            continue
+        l.append(path)
+        l.append(str(lineno))
+        yield l
+
+def logicalLines(read):
+    """
+    Yield (line, lineno) for each interesting line in read, an open file
+    or memory map, joining narratives broken over lines or pages back on
+    to their data line.  lineno is the line number of the last physical
+    line joined.
+    """
+    # contortions here with alternating lines are to handle narrative
+    # entries in FAU files that are broken into two lines.  Some
+    # of these breaks happen around page breaks in the files.  Each
+    # physical line is classified once, as it is read
+    buf = read.readline().strip()
+    bufkind = classify(buf)
+    nextline = read.readline()
+    stripped = nextline.strip()
+    kind = classify(stripped)
+    lineno = 1  # line number in buffer
+    while nextline:
+        if bufkind == DATA:
+            if kind == DATA:
+                # handle case where narr split b/w lines
+                buf += stripped
+                nextline = read.readline()
+                stripped = nextline.strip()
+                kind = classify(stripped)
+                lineno += 1
+            elif kind == PAGENO:
+                # handle case where narr split b/w pages
+                while nextline and kind != DATA:
+                    nextline = read.readline()
+                    stripped = nextline.strip()
+                    kind = classify(stripped)
+                    lineno += 1
+                if nextline and len(stripped.split()) <= 4:  # number found by experimentation
+                    buf += stripped
+                    nextline = read.readline()
+                    stripped = nextline.strip()
+                    kind = classify(stripped)
+                    lineno += 1
+            # write out what's in buf
+            yield buf, lineno
+        # check before assigning EOF to buf
+        if nextline:
+            buf = stripped
+            bufkind = kind
+            lineno += 1
+            nextline = read.readline()
+            stripped = nextline.strip()
+            kind = classify(stripped)
+    # don't forget last line in buffer (which may have been added to
+    #   since it was classified)...
+    if interesting(buf):
+        yield buf, lineno
+
+#############################################################
+# Process-pool extraction.  Files are handed out to workers
+#   one at a time and results are collected in submission
+#   order, so output matches the serial path exactly.
+#
+def _extract_one(path):
+    rows = list()
+    weirdos = extract_file(path, rows)
+    return path, rows, weirdos
+
+def _extract_files(paths, processes, manifest=None):
+    """Yield (path, rows, weirdos) for each of paths, in order."""
+    if manifest is not None:
+        # hits and misses are told apart up front, so that misses can go
+        #   to the pool together, but cached rows are only copied out as
+        #   their file's turn comes
+        paths = list(paths)
+        fresh = [manifest.fresh(path) for path in paths]
+        parsed = _extract_files([path for path, f in zip(paths, fresh) if
+                                 not f],
+                                processes)
+        for path, f in zip(paths, fresh):
+            if f:
+                rows, weirdos = manifest.get(path)
+            else:
+                path, rows, weirdos = next(parsed)
+                manifest.store(path, rows, weirdos)
+            yield path, rows, weirdos
+        for result in parsed:  # let pool shut down
+            pass
+        return
+    if processes == 1:
+        for path in paths:
+            yield _extract_one(path)
+        return
+    pool = multiprocessing.Pool(processes)
+    try:
+        for result in pool.imap(_extract_one, paths):
+            yield result
+    finally:
+        pool.close()
+        pool.join()
+
+#############################################################
+# Read-ahead of files by background threads, so that waiting on
+#   the disk or network overlaps parsing.  A thread takes a slot
+#   before taking the next file, and the slot is given back when
+#   the file is handed on, so at most <prefetch> files are held
+#   besides the one being parsed.
+#   Files are handed on in the order given, whichever thread
+#   read them.
+#
+READERS = 2  # threads reading ahead
+
+def readFile(path):
+    """Return the contents of the file at path."""
+    with open(path, 'rb') as f:
+        return f.read()
+
+def prefetched(paths, prefetch, readers=READERS):
+    """
+    Yield (path, contents) for each of paths, in order, with up to
+    prefetch files read ahead by readers threads.  An error reading a file
+    is raised when its turn comes.
+    """
+    paths = iter(paths)
+    lock = threading.Lock()
+    ready = threading.Condition(lock)
+    slots = threading.Semaphore(max(prefetch, 1))
+    results = dict()  # index : (path, contents, exc_info)
+    state = {'taken': 0, 'end': None, 'error': None, 'stop': False}
+
+    def read():
+        while True:
+            slots.acquire()
+            with lock:
+                if state['stop'] or state['end'] is not None:
+                    return
+                i = state['taken']
+                try:
+                    path = next(paths)
+                except StopIteration:
+                    state['end'] = i
+                except Exception:  # e.g. from os.walk
+                    state['end'], state['error'] = i, sys.exc_info()
+                if state['end'] is not None:
+                    ready.notify_all()
+                    return
+                state['taken'] += 1
+            try:
+                result = path, readFile(path), None
+            except Exception:
+                result = path, None, sys.exc_info()
+            with lock:
+                results[i] = result
+                ready.notify_all()
+
+    threads = [threading.Thread(target=read) for r in range(max(readers, 1))]
+    for t in threads:
+        t.daemon = True
+        t.start()
+    try:
+        i = 0
+        while True:
+            with lock:
+                while i not in results and (state['end'] is None or
+                                            i < state['end']):
+                    ready.wait()
+                if i not in results:  # all passed on
+                    break
+                path, data, exc = results.pop(i)
+            slots.release()
+            if exc is not None:
+                raise exc[0], exc[1], exc[2]
+            yield path, data
+            i += 1
+        exc = state['error']
+        if exc is not None:
+            raise exc[0], exc[1], exc[2]
+    finally:
+        with lock:
+            state['stop'] = True
+        for t in threads:  # wake any waiting for a slot
+            slots.release()
+#
+#############################################################
+
+def extract_all(startpath, flags=('FAU', 'ACT'), processes=1,
+                manifest=None):
+    """
+    Extract data for each of flags in a single walk through startpath.
+
+    @type  startpath: str
+    @param startpath: top of subdirectory to be searched
+    @type  flags: sequence
+    @param flags: substrings for selecting searched files, as FLAG in
+                  extract_data
+    @type  processes: int
+    @param processes: number of worker processes, as in extract_data
+    @type  manifest: manifest.Manifest
+    @param manifest: if given, cache of results per file, as in extract_data
+    @rtype:   dict
+    @return:  flag : (rows, weirdos) items, where rows and weirdos are the
+              same, and in the same order, as extract_data would give for
+              flag
+    """
+    paths = datafiles_by_flag(startpath, flags)
+    ret = dict()
+    for flag in flags:
+        weirdos = list()
+        rows = list(iter_paths(paths[flag], weirdos, processes, manifest))
+        ret[flag] = rows, weirdos
+    return ret
+#
+#############################################################
+
+def writeRow(l, out):
+    """Write l as csv line to file <out> or append it to list <out>."""
+    try:
+        out.write(DEF.__ascii_csv_delim__.join(l) + '\n')
+        return
+    except AttributeError:
+        pass
+    try:
+        out.append(l)
+    except AttributeError:
+        print "From handleline, cannot output data to %s" % out
+        raise
+
 def handleline(line, out, filename, lineno):
     """Write csv line to file <out> or append list of values to list <out>."""
-    if tooFewValues(line):
-        return line
+    l, weird = parseline(line)
+    if l is not None:
+        l.append(filename)
+        l.append(str(lineno))
+        writeRow(l, out)
+        return None
+    return weird
+
+def parseline(line):
+    """
+    Split a data line into its fields.
+
+    The line is tokenized once, up to the narrative; the fix-ups for junk
+    'U' tokens and split WUC codes, which re-tokenize, are rare.  The
+    narrative is sliced off the line where it starts.
+
+    @rtype:  tuple
+    @return: (values, None) where values is the list of 9 field values, or
+             (None, line) if line could not be processed, where line is
+             line as cleaned up on the way
+    """
+    l, line, reason = parseReason(line)
+    return l, line
+
+def parseReason(line, branches=None):
+    """
+    parseline, also giving the reason a line could not be processed: 'too
+    few values', 'layout' (too few tokens for the layout they suggest) or
+    a check that failed, as checkReason.
+
+    @type  branches: dict
+    @param branches: if given, dict in which the layout taken for each
+                     line, and each fix-up made to it, is counted
+    @rtype:  tuple
+    @return: (values, None, None) or (None, line, reason)
+    """
+    toks = line.split(None, NTOKENS)
+    if len(toks) <= 2:  # too few values
+        return None, line, 'too few values'
     l = list()
-    if looksLikeDate(firstToken(line)):
-        if isJunkU(thirdToken(line)):
-            l = line.split(None, 3)
-            l.pop(2)
-            line = ' '.join(l)
-        if looksLikeSysCode(fourthToken(line)): # wuc code looks split
-            l = line.split(None, 9)
-            l[1] += '-' + l[2]
-            l.pop(2)
-            line = ' '.join(l)
-        if looksLikeModel(secondToken(line)):  # no wuc, no sys code
-            if not looksLikeStatus(sixthToken(line)):  # missing status value
-                l = line.split(None, 5)
+    try:
+        if looksLikeDate(toks[0]):
+            if isJunkU(toks[2]):
+                l = splitTokens(line, toks, 3)
+                l.pop(2)
+                line = ' '.join(l)
+                toks = line.split(None, NTOKENS)
+                if branches is not None:
+                    _count(branches, 'junk U')
+            if looksLikeSysCode(toks[3]): # wuc code looks split
+                l = splitTokens(line, toks, 9)
+                l[1] += '-' + l[2]
+                l.pop(2)
+                line = ' '.join(l)
+                toks = line.split(None, NTOKENS)
+                if branches is not None:
+                    _count(branches, 'split wuc')
+            if looksLikeModel(toks[1]):  # no wuc, no sys code
+                if not looksLikeStatus(toks[5]):  # missing status value
+                    l = splitTokens(line, toks, 5)
+                    l.insert(1, '')
+                    l.insert(2, '')
+                    l.insert(7, '')
+                    branch = 'no wuc, sys code or status'
+                else:
+                    l.insert(1, '')
+                    l.insert(2, '')
+                    branch = 'no wuc or sys code'
+            elif looksLikeSysCode(toks[2]): # something probly exists in wuc code
+                l = splitTokens(line, toks, 8)
+                branch = 'wuc'
+            else: # insert null value for wuc code
+                l = splitTokens(line, toks, 7)
                 l.insert(1, '')
-                l.insert(2, '')
-                l.insert(7, '')
+                branch = 'no wuc'
+        else:  # date completed not found
+            if isJunkU(toks[1]):
+                l = splitTokens(line, toks, 2)
+                l.pop(1)
+                line = ' '.join(l)
+                toks = line.split(None, NTOKENS)
+                if branches is not None:
+                    _count(branches, 'junk U')
+            if looksLikeSysCode(toks[2]): # wuc code looks split
+                l = splitTokens(line, toks, 8)
+                l[0] += '-' + l[1]
+                l.pop(1)
+                line = ' '.join(l)
+                toks = line.split(None, NTOKENS)
+                if branches is not None:
+                    _count(branches, 'split wuc')
+            if looksLikeSysCode(toks[1]): # something probly exists for wuc code
+                l = splitTokens(line, toks, 7)
+                l.insert(0, '')            # insert null value for date completed
+                branch = 'no corr date'
             else:
-                l.insert(1, '')
-                l.insert(2, '')
-        elif looksLikeSysCode(thirdToken(line)): # something probly exists in wuc code
-            l = line.split(None, 8)
-        else: # insert null value for wuc code
-            l = line.split(None, 7)
-            l.insert(1, '')
-    else:  # date completed not found
-        if isJunkU(secondToken(line)):
-            l = line.split(None, 2)
-            l.pop(1)
-            line = ' '.join(l)
-        if looksLikeSysCode(thirdToken(line)): # wuc code looks split
-            l = line.split(None, 8)
-            l[0] += '-' + l[1]
-            l.pop(1)
-            line = ' '.join(l)
-        if looksLikeSysCode(secondToken(line)): # something probly exists for wuc code
-            l = line.split(None, 7)
-            l.insert(0, '')            # insert null value for date completed
-        else:
-            l = line.split(None, 6)
-            l.insert(0, '') #insert null value for date completed
-            l.insert(1, '') #insert null value for wuc code
+                l = splitTokens(line, toks, 6)
+                l.insert(0, '') #insert null value for date completed
+                l.insert(1, '') #insert null value for wuc code
+                branch = 'no corr date or wuc'
+    except IndexError:  # too few tokens for the layout they suggest
+        return None, line, 'layout'
 
+    if branches is not None:
+        _count(branches, branch)
     if noNarrField(l):
         l.append('')
 
-    # line cleaned up as much as can be, now check, polish, write
-    if check(l):
-        l.append(filename)
-        l.append(str(lineno))
-        try:
-            out.write(DEF.__ascii_csv_delim__.join(l) + '\n')
-            return None
-        except AttributeError:
-            pass
-        try:
-            out.append(l)
-            return None
-        except AttributeError:
-            print "From handleline, cannot output data to %s" % out
-            raise
-    return line
+    # line cleaned up as much as can be, now check
+    reason = checkReason(l)
+    if reason is None:
+        return l, None, None
+    return None, line, reason
+
+def _count(counts, key):
+    counts[key] = counts.get(key, 0) + 1
+
+NTOKENS = 9  # most tokens parseline splits off ahead of the narrative
+# TOKENSTART[n] matches a line up to the start of its token n
+TOKENSTART = [re.compile('\s*(?:\S+\s+){%d}' % n) for n in range(NTOKENS)]
+
+def splitTokens(line, toks, n):
+    """
+    Return line.split(None, n), for n <= NTOKENS, given toks as
+    line.split(None, NTOKENS).
+    """
+    if n == NTOKENS or len(toks) <= n:
+        return toks[:]
+    return toks[:n] + [line[TOKENSTART[n].match(line).end():]]
+
+#############################################################
+# Accounting of rejected lines, in place of a weirdos list.
+#
+SAMPLESIZE = 20  # rejected lines kept per reason
+
+class Rejects(object):
+    """
+    Counts of the lines parseline could not process, by reason (see
+    parseReason), and of the layouts and fix-ups parseline used, with a
+    uniform sample of at most samplesize rejected lines per reason.
+
+    Passed as weirdos to iter_data, memory stays bounded however many lines
+    are rejected.  When files are parsed in worker processes or taken from a
+    manifest, only the rejected lines come back, and their reasons are found
+    by parsing them again; layouts are then not counted.
+    """
+    def __init__(self, samplesize=SAMPLESIZE, seed=0):
+        self.samplesize = samplesize
+        self.reasons = dict()   # reason : lines rejected
+        self.branches = dict()  # layout or fix-up : lines parsed
+        self.samples = dict()   # reason : [(line, path, lineno), ...]
+        self._random = random.Random(seed)
+
+    def __len__(self):
+        return sum(self.reasons.values())
+
+    def add(self, reason, line, path=None, lineno=None):
+        """Count line, from path at lineno, as rejected for reason."""
+        n = self.reasons.get(reason, 0) + 1
+        self.reasons[reason] = n
+        sample = self.samples.setdefault(reason, [])
+        if len(sample) < self.samplesize:
+            sample.append((line, path, lineno))
+        else:  # keep each of the n seen with chance samplesize / n
+            i = self._random.randrange(n)
+            if i < self.samplesize:
+                sample[i] = (line, path, lineno)
+
+    def extend(self, weirdos):
+        """Count each of weirdos, (line, path, lineno) as from iter_data."""
+        for line, path, lineno in weirdos:
+            self.add(parseReason(line)[2] or 'unknown', line, path, lineno)
+
+    def __iadd__(self, weirdos):
+        self.extend(weirdos)
+        return self
+
+    def report(self):
+        """Return the counts and samples as text, commonest reason first."""
+        out = list()
+        for reason, n in sorted(self.reasons.items(), key=lambda i: -i[1]):
+            out.append('%8d  %s' % (n, reason))
+            for line, path, lineno in self.samples[reason]:
+                out.append('          %s:%s: %s' % (path, lineno, line))
+        for branch, n in sorted(self.branches.items(), key=lambda i: -i[1]):
+            out.append('%8d  parsed as %s' % (n, branch))
+        return '\n'.join(out)
+#
+#############################################################
 
 #######################################################################
 # definitions for examining FAUACT files
@@ -0,0 +1,19 @@
+"""
+File handling shared by the modules that keep files of their own (the
+manifest, snapshots, the record index).
+"""
+
+import os
+import sys
+
+if sys.platform == 'win32':
+    import ctypes
+    _MOVEFILE_REPLACE_EXISTING = 1
+
+    def replace(src, dst):
+        """Rename file src to dst, replacing any file at dst in one step."""
+        if not ctypes.windll.kernel32.MoveFileExW(
+            unicode(src), unicode(dst), _MOVEFILE_REPLACE_EXISTING):
+            raise ctypes.WinError()
+else:
+    replace = os.rename  # atomic on POSIX, replacing any file at dst
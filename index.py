@@ -0,0 +1,211 @@
+"""
+On-disk index of cleaned records (the merged ASCII frame, say), for
+looking up one record by recordId, or an airframe's records between two
+dates, without loading the whole frame.
+
+The records are kept in a sqlite database, with B-tree indexes on REC_ID
+and on (EI_ID, EVENT_DATE, FAULTNO), so each lookup is O(log n) and reads
+only the rows it returns.  Column types (datetime, categorical, numeric)
+are recorded so that frames come back typed as they went in; datetimes are
+kept as nanoseconds, so they compare in order, and categoricals as their
+codes, with the categories in a table of their own.
+"""
+
+import os
+import sqlite3
+import collections
+
+import numpy
+import pandas
+
+from .fileutil import replace
+
+RECID = 'REC_ID'
+AIRFRAME_KEY = ['EI_ID', 'EVENT_DATE', 'FAULTNO']
+CHUNKSIZE = 50000  # rows written at a time
+NAT = numpy.datetime64('NaT').view('i8')
+
+def build(df, path, chunksize=CHUNKSIZE):
+    """
+    Write DataFrame df to an index at path, replacing any there, and return
+    RecordIndex of it.  df must have the columns REC_ID, EI_ID, EVENT_DATE
+    and FAULTNO; its index is not kept.
+
+    @type  df: pandas.DataFrame
+    @type  path: str
+    @rtype: RecordIndex
+    """
+    missing = [c for c in [RECID] + AIRFRAME_KEY if c not in df.columns]
+    if missing:
+        raise KeyError("index needs columns %s" % ', '.join(missing))
+    kinds = [_kind(df[c]) for c in df.columns]
+    tmp = path + '.tmp'
+    if os.path.exists(tmp):
+        os.remove(tmp)
+    conn = sqlite3.connect(tmp)
+    conn.text_factory = str  # 8-bit strs in and out, as in the pipeline
+    try:
+        conn.execute('CREATE TABLE columns (pos INTEGER, name TEXT, '
+                     'kind TEXT)')
+        conn.executemany('INSERT INTO columns VALUES (?, ?, ?)',
+                         [(i, c, k) for i, (c, k) in
+                          enumerate(zip(df.columns, kinds))])
+        conn.execute('CREATE TABLE categories (name TEXT, code INTEGER, '
+                     'value)')
+        for c, k in zip(df.columns, kinds):
+            if k == 'category':
+                conn.executemany('INSERT INTO categories VALUES (?, ?, ?)',
+                                 [(c, i, v) for i, v in
+                                  enumerate(df[c].cat.categories)])
+        conn.execute('CREATE TABLE records (%s)' %
+                     ', '.join(_quote(c) for c in df.columns))
+        insert = 'INSERT INTO records VALUES (%s)' % ', '.join(
+            '?' * len(df.columns))
+        for start in xrange(0, len(df), chunksize):
+            chunk = df.iloc[start:start + chunksize]
+            columns = [_toSql(chunk[c], k) for c, k in zip(chunk.columns,
+                                                            kinds)]
+            conn.executemany(insert, zip(*columns))
+        conn.execute('CREATE INDEX recid ON records (%s)' % _quote(RECID))
+        conn.execute('CREATE INDEX airframe ON records (%s)' %
+                     ', '.join(_quote(c) for c in AIRFRAME_KEY))
+        conn.commit()
+    except:
+        conn.close()
+        os.remove(tmp)
+        raise
+    conn.close()
+    replace(tmp, path)
+    return RecordIndex(path)
+
+class RecordIndex(object):
+    """Index written by build, opened for lookups."""
+    def __init__(self, path):
+        """
+        @type  path: str
+        @param path: index written by build
+        """
+        if not os.path.exists(path):
+            raise IOError("no record index at %s" % path)
+        self.path = path
+        self.conn = sqlite3.connect(path)
+        self.conn.text_factory = str
+        rows = self.conn.execute('SELECT name, kind FROM columns '
+                                 'ORDER BY pos').fetchall()
+        self.columns = [name for name, kind in rows]
+        self.kinds = dict(rows)
+        self.categories = dict((c, list()) for c, k in rows
+                               if k == 'category')
+        for name, value in self.conn.execute(
+            'SELECT name, value FROM categories ORDER BY name, code'):
+            self.categories[name].append(value)
+        self._codes = dict((c, dict((v, i) for i, v in enumerate(values)))
+                           for c, values in self.categories.items())
+        self._dtypes = dict((c, pandas.api.types.CategoricalDtype(values))
+                            for c, values in self.categories.items())
+        self._select = 'SELECT %s FROM records' % ', '.join(
+            _quote(c) for c in self.columns)
+
+    def __len__(self):
+        return self.conn.execute('SELECT COUNT(*) FROM records').fetchone()[0]
+
+    def __contains__(self, recId):
+        return self.conn.execute(
+            'SELECT 1 FROM records WHERE %s = ? LIMIT 1' % _quote(RECID),
+            [self._toSql(RECID, recId)]).fetchone() is not None
+
+    def get(self, recId):
+        """
+        Return DataFrame of the records with recordId recId: one, unless
+        the frame indexed held duplicates, or none.
+        """
+        return self._query(' WHERE %s = ?' % _quote(RECID),
+                           [self._toSql(RECID, recId)])
+
+    def between(self, ei_id, start=None, end=None):
+        """
+        Return DataFrame of the records of airframe ei_id with EVENT_DATE
+        from start to end, inclusive, in order of EVENT_DATE and FAULTNO.
+
+        @type  start, end: str or datetime
+        @param start, end: bounds on EVENT_DATE, or None for no bound.  Of
+                           the type of the EVENT_DATE column, or anything
+                           pandas.Timestamp takes if it holds datetimes.
+        """
+        ei, date, faultno = [_quote(c) for c in AIRFRAME_KEY]
+        where, args = ' WHERE %s = ?' % ei, [self._toSql(AIRFRAME_KEY[0],
+                                                         ei_id)]
+        for op, bound in [('>=', start), ('<=', end)]:
+            if bound is not None:
+                where += ' AND %s %s ?' % (date, op)
+                args.append(self._toSql(AIRFRAME_KEY[1], bound))
+        return self._query(where + ' ORDER BY %s, %s' % (date, faultno),
+                           args)
+
+    def close(self):
+        self.conn.close()
+
+    def _query(self, where, args):
+        rows = self.conn.execute(self._select + where, args).fetchall()
+        columns = zip(*rows) or [()] * len(self.columns)
+        # an OrderedDict, as columns= would have the frame reindexed
+        return pandas.DataFrame(collections.OrderedDict(
+            (c, self._fromSql(c, v)) for c, v in zip(self.columns, columns)))
+
+    def _toSql(self, column, value):
+        """Return value, sought in column, as it is kept."""
+        kind = self.kinds[column]
+        if kind == 'datetime':
+            return pandas.Timestamp(value).value
+        if kind == 'category':
+            return self._codes[column].get(value)  # None matches nothing
+        return value
+
+    def _fromSql(self, column, values):
+        """Return array of values of column, as kept, as written."""
+        kind = self.kinds[column]
+        if kind == 'category':
+            return pandas.Categorical.from_codes(
+                numpy.array(values, dtype='i8'), dtype=self._dtypes[column])
+        return _fromSql(values, kind)
+
+def _quote(name):
+    return '"%s"' % name.replace('"', '""')
+
+def _kind(s):
+    """Return how Series s is kept in an index."""
+    if str(s.dtype) == 'category':
+        return 'category'
+    if s.dtype.kind == 'M':
+        return 'datetime'
+    if s.dtype.kind in 'iub':
+        return 'int'
+    if s.dtype.kind == 'f':
+        return 'float'
+    return 'object'
+
+def _toSql(s, kind):
+    """Return list of the values of Series s as sqlite takes them."""
+    if kind == 'datetime':
+        values = s.values.view('i8').astype(object)
+        values[s.isnull().values] = None
+        return values.tolist()
+    if kind in ('int', 'float'):
+        return s.values.tolist()
+    if kind == 'category':
+        return s.cat.codes.values.tolist()  # -1 where missing
+    values = numpy.array(s.values, dtype=object)
+    values[s.isnull().values] = None
+    return values.tolist()
+
+def _fromSql(values, kind):
+    """Return array of values, read back from an index, as written."""
+    if kind == 'datetime':
+        return numpy.array([NAT if v is None else v for v in values],
+                           dtype='i8').view('M8[ns]')
+    if kind == 'float' or (kind == 'int' and None in values):
+        return numpy.array(values, dtype=float)
+    if kind == 'int':
+        return numpy.array(values, dtype='i8')
+    return numpy.array([numpy.nan if v is None else v for v in values],
+                       dtype=object)
@@ -0,0 +1,137 @@
+"""
+Persistent per-file cache of extracted ASCII data, so that a rerun of the
+extraction only parses report files that are new or have changed.
+"""
+
+import os
+import hashlib
+try:
+    import cPickle as pickle
+except ImportError:
+    import pickle
+
+from .fileutil import replace
+
+_VERSION = 2  # bump when extraction output changes, to discard old caches
+_BLOCKSIZE = 1 << 20
+
+def digest(path):
+    """Return sha1 hex digest of the contents of file at path."""
+    h = hashlib.sha1()
+    with open(path, 'rb') as f:
+        block = f.read(_BLOCKSIZE)
+        while block:
+            h.update(block)
+            block = f.read(_BLOCKSIZE)
+    return h.hexdigest()
+
+class Manifest(object):
+    """
+    Extracted rows and weirdos for each file, keyed on path and checked
+    against the file's size, mtime and content hash.
+
+    A file whose size and mtime are unchanged is taken as is; otherwise its
+    content hash decides whether the cached results still hold.  Entries
+    for files that no longer exist are dropped on save.
+
+    Only the size, mtime and hash of each file are held in memory and kept
+    in the manifest file itself.  Each file's rows and weirdos are kept in
+    a file of their own, in the directory <path>.d, written when they are
+    stored and read back when they are asked for, so that no more than one
+    file's rows are held at a time.
+    """
+    def __init__(self, path):
+        """
+        @type  path: str
+        @param path: file in which manifest is kept.  Need not exist yet.
+        """
+        self.path = path
+        self.directory = path + '.d'
+        self.entries = dict()   # path : {'size', 'mtime', 'sha1'}
+        self._pending = dict()  # path : (size, mtime, digest) of misses
+        try:
+            with open(path, 'rb') as f:
+                version, entries = pickle.load(f)
+        except (IOError, OSError, EOFError):
+            return
+        if version == _VERSION:
+            self.entries = entries
+
+    def lookup(self, path):
+        """
+        Return (rows, weirdos) cached for file at path, or None if the file
+        is new or has changed and must be parsed.
+        """
+        if self.fresh(path):
+            return self.get(path)
+        return None
+
+    def fresh(self, path):
+        """
+        Return whether the results cached for file at path still hold,
+        from its size and mtime or else its content hash.  Nothing cached
+        is read, so every file can be checked before any is read back.
+        """
+        st = os.stat(path)
+        entry = self.entries.get(path)
+        if entry is not None and not os.path.exists(self._rowsPath(path,
+                                                                   entry)):
+            entry = None
+        if (entry is not None and
+            entry['size'] == st.st_size and
+            entry['mtime'] == st.st_mtime):
+            return True
+        sha = digest(path)
+        if entry is not None and entry['sha1'] == sha:
+            entry['size'] = st.st_size
+            entry['mtime'] = st.st_mtime
+            return True
+        self._pending[path] = (st.st_size, st.st_mtime, sha)
+        return False
+
+    def get(self, path):
+        """Return (rows, weirdos) cached for file at path, found fresh."""
+        with open(self._rowsPath(path, self.entries[path]), 'rb') as f:
+            return pickle.load(f)
+
+    def store(self, path, rows, weirdos):
+        """Cache rows and weirdos parsed from file at path."""
+        try:
+            size, mtime, sha = self._pending.pop(path)
+        except KeyError:
+            st = os.stat(path)
+            size, mtime, sha = st.st_size, st.st_mtime, digest(path)
+        if not os.path.isdir(self.directory):
+            os.makedirs(self.directory)
+        old = self.entries.get(path)
+        entry = {'size': size, 'mtime': mtime, 'sha1': sha}
+        rowsPath = self._rowsPath(path, entry)
+        with open(rowsPath + '.tmp', 'wb') as f:
+            pickle.dump((rows, weirdos), f, pickle.HIGHEST_PROTOCOL)
+        replace(rowsPath + '.tmp', rowsPath)
+        if old is not None and old['sha1'] != sha:
+            self._remove(path, old)
+        self.entries[path] = entry
+
+    def save(self):
+        """Write manifest to self.path, dropping files since deleted."""
+        for path in [p for p in self.entries if not os.path.exists(p)]:
+            self._remove(path, self.entries.pop(path))
+        tmp = self.path + '.tmp'
+        with open(tmp, 'wb') as f:
+            pickle.dump((_VERSION, self.entries), f, pickle.HIGHEST_PROTOCOL)
+        replace(tmp, self.path)
+
+    def _rowsPath(self, path, entry):
+        # named for the report file's path and contents, so a stale file
+        #   is never taken for a fresh one
+        name = hashlib.sha1(path.encode('utf-8') if isinstance(path, unicode)
+                            else path).hexdigest()
+        return os.path.join(self.directory,
+                            '%s.%s.pkl' % (name, entry['sha1']))
+
+    def _remove(self, path, entry):
+        try:
+            os.remove(self._rowsPath(path, entry))
+        except OSError:
+            pass
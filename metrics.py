@@ -0,0 +1,224 @@
+"""
+Per-stage metrics for the extraction and cleaning pipeline: wall and CPU
+time, growth in peak resident size, records in and out, and records
+dropped by each cleaning rule.
+
+Stages are either blocks (Metrics.stage) or record streams
+(Metrics.iterate).  Streamed stages run interleaved, each pulling from the
+one before, so time is charged exclusively: a stage's time does not include
+time spent in the stages it pulls from.  Growth in peak resident size is
+that of the whole process while the stage was open, so stages streamed
+together see the same growth.
+
+Each finished stage is passed, as a dict, to a sink: a function, a file
+(or name of one) to which it is written as a line of JSON, or None to
+keep the stages only in Metrics.stages.  NO_METRICS takes the place of a
+Metrics when metrics are off, passing streams through untouched.
+"""
+
+import os
+import sys
+import time
+import json
+import contextlib
+try:
+    import resource
+except ImportError:  # win32
+    resource = None
+
+if sys.platform == 'win32':
+    def _cputime():
+        t = os.times()
+        return t[0] + t[1]
+else:
+    _cputime = time.clock  # cpu time of the process on Unix
+
+# bytes per unit of ru_maxrss: kilobytes, except bytes on Mac OS X
+_RSS_UNIT = 1 if sys.platform == 'darwin' else 1024
+
+def _maxrss():
+    """Return peak resident size of the process so far, in MB, or None."""
+    if resource is None:
+        return None
+    maxrss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return maxrss * _RSS_UNIT / 2.0**20
+
+def metricsSink(sink):
+    """
+    Return (emit, close) for sink: a function emit(dict), or None if sink
+    is None, and a function to call when done, or None.  A str sink names
+    a file to which a line of JSON is appended per dict; a file is written
+    the same way but left open.
+    """
+    if sink is None or callable(sink):
+        return sink, None
+    close = None
+    if isinstance(sink, basestring):
+        sink = open(sink, 'a')
+        close = sink.close
+    def emit(d):
+        sink.write(json.dumps(d, sort_keys=True) + '\n')
+        sink.flush()
+    return emit, close
+
+class Stage(object):
+    """Metrics of one stage of a pipeline."""
+    def __init__(self, name, records_in=None, upstream=None, rule=None):
+        self.name = name
+        self.records_in = records_in
+        self.records_out = None
+        self.upstream = upstream
+        self.rule = rule
+        self.wall = 0.0
+        self.cpu = 0.0
+        self.maxrss = None
+        self._maxrss = _maxrss()
+
+    @property
+    def dropped(self):
+        """Records in less records out, or None if either is unknown."""
+        if self.records_in is None or self.records_out is None:
+            return None
+        return self.records_in - self.records_out
+
+    def asdict(self):
+        return {'stage': self.name, 'wall': self.wall, 'cpu': self.cpu,
+                'maxrss_mb': self.maxrss, 'records_in': self.records_in,
+                'records_out': self.records_out, 'rule': self.rule,
+                'dropped': self.dropped}
+
+class Metrics(object):
+    """
+    Metrics of the stages of a run of a pipeline, passed to a sink as each
+    stage finishes, and a total passed on close.
+    """
+    def __init__(self, sink=None):
+        """
+        @type  sink: callable, str or file
+        @param sink: where each stage's metrics go, as metricsSink
+        """
+        self.emit, self._close = metricsSink(sink)
+        self.stages = list()  # finished Stages, in order of finishing
+        self.drops = dict()   # rule : records dropped
+        self._stack = list()  # [wall, cpu] of nested stages, per open stage
+        self._start = time.time(), _cputime(), _maxrss()
+
+    def stage(self, name, records_in=None, upstream=None, rule=None):
+        """
+        Return context manager timing the block it encloses as stage name,
+        giving the Stage, on which records_out (and records_in, if not
+        given here) should be set.
+
+        @type  upstream: str
+        @param upstream: name of the stage whose records_out is this
+                         stage's records_in, if records_in is not given
+        @type  rule: str
+        @param rule: cleaning rule by which records are dropped in this
+                     stage, under which records in less records out are
+                     counted in drops
+        """
+        return self._timed(Stage(name, records_in, upstream, rule))
+
+    @contextlib.contextmanager
+    def _timed(self, s):
+        mark = self._enter()
+        try:
+            yield s
+        finally:
+            self._exit(s, mark)
+            self._finish(s)
+
+    def iterate(self, name, iterable, upstream=None, rule=None):
+        """
+        Pass on the items of iterable, timing each step of it as stage name
+        and counting the items as its records_out.  Arguments as for stage.
+        """
+        s = Stage(name, None, upstream, rule)
+        it = iter(iterable)
+        n = 0
+        try:
+            while True:
+                mark = self._enter()
+                try:
+                    item = next(it)
+                except StopIteration:
+                    break
+                finally:
+                    self._exit(s, mark)
+                n += 1
+                yield item
+        finally:
+            s.records_out = n
+            self._finish(s)
+
+    def drop(self, rule, n):
+        """Count n records dropped by rule outside of any stage."""
+        self.drops[rule] = self.drops.get(rule, 0) + n
+
+    def close(self):
+        """Pass the totals for the run to the sink, and close it."""
+        wall, cpu, maxrss = self._start
+        total = {'stage': 'total', 'wall': time.time() - wall,
+                 'cpu': _cputime() - cpu, 'drops': dict(self.drops),
+                 'maxrss_mb': None if maxrss is None else _maxrss() - maxrss}
+        if self.emit is not None:
+            self.emit(total)
+        if self._close is not None:
+            self._close()
+            self._close = None
+        return total
+
+    def _enter(self):
+        self._stack.append([0.0, 0.0])
+        return time.time(), _cputime()
+
+    def _exit(self, s, mark):
+        wall, cpu = time.time() - mark[0], _cputime() - mark[1]
+        inner = self._stack.pop()
+        s.wall += wall - inner[0]
+        s.cpu += cpu - inner[1]
+        if self._stack:
+            self._stack[-1][0] += wall
+            self._stack[-1][1] += cpu
+
+    def _finish(self, s):
+        if s._maxrss is not None:
+            s.maxrss = _maxrss() - s._maxrss
+        if s.records_in is None and s.upstream is not None:
+            for u in reversed(self.stages):
+                if u.name == s.upstream:
+                    s.records_in = u.records_out
+                    break
+        if s.rule is not None and s.dropped is not None:
+            self.drop(s.rule, s.dropped)
+        self.stages.append(s)
+        if self.emit is not None:
+            self.emit(s.asdict())
+
+class _NullStage(object):
+    """Stage of NO_METRICS: takes records_out and the like, and ignores
+    them."""
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+class _NoMetrics(object):
+    """Metrics that are off, at the cost of a call per stage."""
+    stages = ()
+    drops = {}
+
+    def stage(self, name, records_in=None, upstream=None, rule=None):
+        return _NullStage()
+
+    def iterate(self, name, iterable, upstream=None, rule=None):
+        return iterable
+
+    def drop(self, rule, n):
+        pass
+
+    def close(self):
+        return None
+
+NO_METRICS = _NoMetrics()
@@ -0,0 +1,198 @@
+"""
+Columnar snapshots of the DataFrames handed between pipeline stages
+(extracted, cleaned and merged ASCII data, VMEP data), so that a later job
+can start from a stage's output instead of recomputing it.
+
+Frames are written in the Arrow IPC file format, which is memory-mapped
+back, or as Parquet if the path ends in .parquet.  Both need pyarrow.
+Without pyarrow, or for a frame Arrow cannot hold (e.g. an object column
+mixing numbers and strings), the frame is pickled instead; load tells the
+formats apart by their leading magic bytes.  Missing values in the object
+columns of an Arrow or Parquet snapshot come back as NaN, as pandas gives
+them, whether they were NaN or None.
+
+dumps and loads do the same for frames passed between processes, as an
+Arrow IPC stream, which is several times quicker than pickling a frame
+of strings.
+"""
+
+import os
+try:
+    import cPickle as pickle
+except ImportError:
+    import pickle
+
+try:
+    import pyarrow
+    import pyarrow.parquet
+except ImportError:
+    pyarrow = None
+
+from .fileutil import replace
+
+ARROW_MAGIC = 'ARROW1'
+PARQUET_MAGIC = 'PAR1'
+
+def save(df, path):
+    """
+    Write DataFrame df to path, as Parquet if path ends in .parquet and as
+    an Arrow IPC file otherwise.  The file is replaced atomically.
+
+    @type  df: pandas.DataFrame
+    @type  path: str
+    @return: format written, 'arrow', 'parquet' or 'pickle'
+    """
+    tmp = path + '.tmp'
+    fmt = 'pickle'
+    table = _toTable(df)
+    if table is not None:
+        if path.endswith('.parquet'):
+            pyarrow.parquet.write_table(table, tmp)
+            fmt = 'parquet'
+        else:
+            with pyarrow.OSFile(tmp, 'wb') as sink:
+                writer = pyarrow.RecordBatchFileWriter(sink, table.schema)
+                writer.write_table(table)
+                writer.close()
+            fmt = 'arrow'
+    if fmt == 'pickle':
+        with open(tmp, 'wb') as f:
+            pickle.dump(df, f, pickle.HIGHEST_PROTOCOL)
+    replace(tmp, path)
+    return fmt
+
+def load(path, columns=None):
+    """
+    Return the DataFrame written to path by save.  Arrow and Parquet files
+    are memory-mapped rather than read.
+
+    @type  path: str
+    @type  columns: list
+    @param columns: if given, names of the only columns to return.  Other
+                    columns of Arrow and Parquet files are not converted.
+    @return: pandas.DataFrame
+    """
+    with open(path, 'rb') as f:
+        magic = f.read(len(ARROW_MAGIC))
+    if magic.startswith(ARROW_MAGIC) or magic.startswith(PARQUET_MAGIC):
+        if pyarrow is None:
+            raise ImportError("pyarrow is needed to read snapshot %s" % path)
+        if magic.startswith(PARQUET_MAGIC):
+            table = pyarrow.parquet.read_table(path, memory_map=True)
+        else:
+            source = pyarrow.memory_map(path, 'r')
+            table = pyarrow.ipc.open_file(source).read_all()
+        if columns is not None:
+            keep = set(columns)
+            keep.update(table.schema.pandas_metadata['index_columns'])
+            table = table.drop([c for c in table.schema.names
+                                if c not in keep])
+            return _fromTable(table)[list(columns)]
+        return _fromTable(table)
+    with open(path, 'rb') as f:
+        df = pickle.load(f)
+    return df if columns is None else df[list(columns)]
+
+def dumps(df):
+    """
+    Return DataFrame df as a str, for loads: an Arrow IPC stream if pyarrow
+    can hold df, otherwise a pickle.
+    """
+    table = _toTable(df)
+    if table is None:
+        return pickle.dumps(df, pickle.HIGHEST_PROTOCOL)
+    sink = pyarrow.BufferOutputStream()
+    writer = pyarrow.RecordBatchStreamWriter(sink, table.schema)
+    writer.write_table(table)
+    writer.close()
+    return sink.getvalue().to_pybytes()
+
+def loads(s):
+    """Return the DataFrame in str s, from dumps."""
+    if s[:1] == '\x80':  # pickle protocol 2 and up
+        return pickle.loads(s)
+    return _fromTable(pyarrow.ipc.open_stream(pyarrow.py_buffer(s)).read_all())
+
+def _toTable(df):
+    """Return pyarrow.Table of df, or None if pyarrow is absent or cannot
+    hold df."""
+    if pyarrow is None:
+        return None
+    try:
+        return pyarrow.Table.from_pandas(df, preserve_index=True)
+    except (pyarrow.ArrowException, TypeError, ValueError):
+        return None
+
+def _fromTable(table):
+    df = table.to_pandas()
+    # Arrow gives None for missing strings, where pandas would give NaN
+    for name in df.columns[(df.dtypes == object).values]:
+        missing = df[name].isnull().values
+        if missing.any():
+            df[name].values[missing] = float('nan')
+    return df
+
+class Store(object):
+    """
+    Directory of snapshots, one file per named pipeline stage.
+
+    Snapshots are never invalidated here: a stage is recomputed only if its
+    file is missing, so remove it (or call clear) when the inputs change.
+    """
+    def __init__(self, directory, parquet=False):
+        """
+        @type  directory: str
+        @param directory: where snapshots are kept.  Created if need be.
+        @type  parquet: bool
+        @param parquet: write Parquet files rather than Arrow IPC files.
+                        Smaller, but decoded on load rather than mapped.
+        """
+        self.directory = directory
+        self.ext = '.parquet' if parquet else '.arrow'
+        if not os.path.isdir(directory):
+            os.makedirs(directory)
+
+    def path(self, stage):
+        """Return the file in which the snapshot of stage is kept."""
+        for ext in ('.arrow', '.parquet'):
+            p = os.path.join(self.directory, stage + ext)
+            if os.path.exists(p):
+                return p
+        return os.path.join(self.directory, stage + self.ext)
+
+    def has(self, stage):
+        return os.path.exists(self.path(stage))
+
+    def save(self, stage, df):
+        """
+        Snapshot DataFrame df as stage, replacing any earlier one.  The new
+        file is in place before a snapshot of the other format is removed,
+        so a crash leaves one snapshot or the other.
+        """
+        save(df, os.path.join(self.directory, stage + self.ext))
+        for ext in ('.arrow', '.parquet'):
+            p = os.path.join(self.directory, stage + ext)
+            if ext != self.ext and os.path.exists(p):
+                os.remove(p)
+        return df
+
+    def load(self, stage):
+        """Return DataFrame snapshotted as stage."""
+        return load(self.path(stage))
+
+    def cached(self, stage, fn, *args, **kwargs):
+        """
+        Return the snapshot of stage if there is one; otherwise return
+        fn(*args, **kwargs), snapshotting it as stage first.
+        """
+        if self.has(stage):
+            return self.load(stage)
+        return self.save(stage, fn(*args, **kwargs))
+
+    def clear(self, stage=None):
+        """Remove the snapshot of stage, or of every stage if None."""
+        for name in os.listdir(self.directory):
+            base, ext = os.path.splitext(name)
+            if (ext in ('.arrow', '.parquet') and
+                (stage is None or base == stage)):
+                os.remove(os.path.join(self.directory, name))
@@ -27,9 +27,7 @@ print 'making list of dfs...'
 dfs = [vmep, ascii]
 print 'concatenating...'
 cc = pandas.concat(dfs)
-cc.sort(['EI_ID', 'EVENT_DATE', 'FAULTNO'],
-            inplace=True, 
-            ascending=[1,0,0])
+cc = dash13.sort_by_id(cc)
 #data = dash13.ascii_plus_vmep()
 #%%
 def elim_newlines(x):